@@ -0,0 +1,237 @@
+"""Offline benchmark of ingestion, per-frame lookups, the leaderboard and rendering
+
+Runs against synthetic sessions (no FastF1 download) at several grid sizes
+and writes the results as JSON, named after the current commit, so runs on
+different commits can be compared. Rendering is timed on a real multi-sim.py
+headless export of the synthetic race, read back from its --profile-csv:
+
+    python benchmark.py                     # writes bench/<commit>.json
+    # set baseline below to a previous results file to print the change
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from race_cache import CACHE_VERSION, cache_path
+from race_data import process_drivers
+from race_file import RaceFile, write_race_file
+from race_timeline import LeaderboardTable, RaceTimeline
+from synthetic_session import SyntheticSession
+
+# Parameters
+driver_counts = [3, 10, 20, 40]
+num_laps = 50
+frames = 600  # Frame times sampled across the race for the per-frame benchmarks
+render_frames = 200  # Frames of the multi-sim export, spread across the race
+workers = 1  # Processes for ingestion (1 keeps timings comparable between machines)
+output_dir = "bench"
+baseline = None  # e.g. "bench/abc1234.json" to print the change against an earlier run
+
+MAP_WIDTH, MAP_HEIGHT = 480, 400  # multi-sim's map area
+RENDER_YEAR, RENDER_EVENT, RENDER_SESSION = 1950, 1, "R"  # Session key the synthetic race is cached under
+MULTI_SIM = os.path.join(os.path.dirname(os.path.abspath(__file__)), "multi-sim.py")
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "local"
+
+
+def per_call(samples):
+    """Mean and p95 of per-call timings, in microseconds"""
+    samples = np.asarray(samples) * 1e6
+    return float(samples.mean()), float(np.percentile(samples, 95))
+
+
+def make_to_screen(all_x, all_y, margin=30):
+    """Same fit-to-map transform as multi-sim's normalize_coords"""
+    x_min, x_max = float(np.min(all_x)), float(np.max(all_x))
+    y_min, y_max = float(np.min(all_y)), float(np.max(all_y))
+    scale = min((MAP_WIDTH - 2*margin) / (x_max - x_min), (MAP_HEIGHT - 2*margin) / (y_max - y_min))
+    x_offset = (MAP_WIDTH - (x_max - x_min) * scale) / 2
+    y_offset = (MAP_HEIGHT - (y_max - y_min) * scale) / 2
+
+    def to_screen(x, y):
+        screen_x = ((np.asarray(x) - x_min) * scale + x_offset).astype(int)
+        screen_y = ((np.asarray(y) - y_min) * scale + y_offset).astype(int)
+        return screen_x, screen_y
+
+    return to_screen
+
+
+def bench_ingest(num_drivers, result):
+    """Synthetic session -> processed timelines, plus a race file round trip"""
+    session = SyntheticSession(num_drivers, num_laps)
+    start = time.perf_counter()
+    session.load()
+    result['session_load_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    timelines = {driver: timeline for driver, timeline, _, _ in process_drivers(session, session.drivers, workers)
+                 if timeline is not None}
+    result['ingest_s'] = time.perf_counter() - start
+    result['samples'] = int(sum(len(timeline['telemetry']) for timeline in timelines.values()))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.race")
+        start = time.perf_counter()
+        write_race_file(path, session.event.EventName, timelines)
+        result['cache_write_s'] = time.perf_counter() - start
+        result['cache_bytes'] = os.path.getsize(path)
+
+        start = time.perf_counter()
+        race = RaceFile(path)
+        for driver in race.drivers:
+            race.timeline(driver)
+            # Touch every column so the pages are actually read
+            for values in race.columns(driver).values():
+                values.sum()
+        result['cache_read_s'] = time.perf_counter() - start
+        race.close()
+
+    return timelines
+
+
+def bench_frames(timelines, result):
+    """Timeline build, per-frame state lookup and leaderboard cost"""
+    all_x = np.concatenate([timeline['telemetry']['x'].to_numpy() for timeline in timelines.values()])
+    all_y = np.concatenate([timeline['telemetry']['y'].to_numpy() for timeline in timelines.values()])
+    to_screen = make_to_screen(all_x, all_y)
+
+    start = time.perf_counter()
+    race_timeline = RaceTimeline(timelines.keys(),
+                                 {driver: timeline['telemetry'] for driver, timeline in timelines.items()},
+                                 to_screen)
+    result['timeline_build_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    leaderboard = LeaderboardTable(race_timeline)
+    result['leaderboard_build_s'] = time.perf_counter() - start
+    result['order_changes'] = int(len(leaderboard.change_ticks))
+
+    max_race_time = max(timeline['total_time'] for timeline in timelines.values())
+    frame_times = np.linspace(0.0, max_race_time, frames)
+
+    lookup = []
+    standings = []
+    for t in frame_times:
+        start = time.perf_counter()
+        state = race_timeline.state_at(t)
+        lookup.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        order, _, _ = leaderboard.at(t)
+        race_timeline.intervals(order, state['total_distance'], t)
+        standings.append(time.perf_counter() - start)
+
+    result['lookup_us_mean'], result['lookup_us_p95'] = per_call(lookup)
+    result['leaderboard_us_mean'], result['leaderboard_us_p95'] = per_call(standings)
+
+
+def bench_render(timelines, result):
+    """Per-frame cost of multi-sim's own renderer, from a headless export of the race
+
+    The synthetic timelines are cached in a scratch directory, so multi-sim
+    loads them like any cached session; --profile-csv records each exported
+    frame from draw through the scale to window size (PNG writes excluded).
+    """
+    max_race_time = max(timeline['total_time'] for timeline in timelines.values())
+    export_fps = 30
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, cache_path(RENDER_YEAR, RENDER_EVENT, RENDER_SESSION))
+        os.makedirs(os.path.dirname(path))
+        write_race_file(path, "Synthetic Grand Prix", timelines, extra_header={
+            'cache_version': CACHE_VERSION, 'year': RENDER_YEAR, 'wknd': RENDER_EVENT, 'ses': RENDER_SESSION,
+            'no_data': [],
+        })
+
+        csv_path = os.path.join(tmp, "frames.csv")
+        subprocess.run(
+            [sys.executable, MULTI_SIM,
+             '--year', str(RENDER_YEAR), '--event', str(RENDER_EVENT), '--session', RENDER_SESSION,
+             '--drivers', *timelines,
+             '--export-dir', os.path.join(tmp, "frames"), '--export-workers', '1',
+             '--export-fps', str(export_fps), '--export-speed', str(max_race_time * export_fps / render_frames),
+             '--profile-csv', csv_path],
+            cwd=tmp, check=True, stdout=subprocess.DEVNULL,
+        )
+        frame_ms = pd.read_csv(csv_path)['frame_total'].to_numpy()
+
+    result['render_ms_mean'] = float(frame_ms.mean())
+    result['render_ms_p95'] = float(np.percentile(frame_ms, 95))
+
+
+def compare(results, previous):
+    """Print each metric's change against an earlier run's results"""
+    print(f"\n>>> Change vs {previous['commit']} ({previous['timestamp']}):")
+    for count, metrics in results['results'].items():
+        before = previous['results'].get(count)
+        if before is None:
+            continue
+        changes = [f"{name} {(value - before[name]) / before[name] * 100:+.1f}%"
+                   for name, value in metrics.items()
+                   if (name.endswith('_s') or '_us_' in name or '_ms_' in name) and before.get(name)]
+        print(f"    {count:>3} drivers: " + ", ".join(changes))
+
+
+if __name__ == '__main__':
+    # Read the baseline up front; this run may overwrite the same file
+    previous = None
+    if baseline:
+        with open(baseline) as f:
+            previous = json.load(f)
+
+    import pygame
+
+    results = {
+        'commit': git_commit(),
+        'timestamp': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'pygame': pygame.version.ver,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'num_laps': num_laps,
+        'frames': frames,
+        'workers': workers,
+        'results': {},
+    }
+
+    print("=" * 60)
+    print(f"RACE ORACLE BENCHMARK - {num_laps} laps, commit {results['commit']}")
+    print("=" * 60)
+
+    for num_drivers in driver_counts:
+        print(f">>> {num_drivers} drivers...")
+        result = {}
+        timelines = bench_ingest(num_drivers, result)
+        bench_frames(timelines, result)
+        bench_render(timelines, result)
+        results['results'][str(num_drivers)] = result
+
+        print(f"    ingest {result['ingest_s']:.2f}s, cache write {result['cache_write_s']:.3f}s / "
+              f"read {result['cache_read_s']:.3f}s")
+        print(f"    lookup {result['lookup_us_mean']:.1f}us, leaderboard {result['leaderboard_us_mean']:.1f}us, "
+              f"render {result['render_ms_mean']:.2f}ms per frame")
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, f"{results['commit']}.json")
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n>>> Results written to {output_path}")
+
+    if previous is not None:
+        compare(results, previous)
+    sys.exit()
@@ -0,0 +1,104 @@
+"""Wall-clock timing for the load sequence and each stage of the frame loop"""
+import csv
+import time
+from collections import deque
+
+import numpy as np
+
+
+class LoadTimer:
+    """Prints and times sequential load stages; starting a stage ends the previous one"""
+
+    def __init__(self):
+        self.timings = {}
+        self._stage = None
+        self._start = 0.0
+
+    def stage(self, title):
+        """Announce and start timing the next stage"""
+        self.done()
+        print(f">>> {title}...")
+        self._stage = title
+        self._start = time.perf_counter()
+
+    def done(self):
+        """Close the running stage, if any, and report how long it took"""
+        if self._stage is None:
+            return
+        seconds = time.perf_counter() - self._start
+        self.timings[self._stage] = seconds
+        print(f"    done in {seconds:.2f}s")
+        self._stage = None
+
+    def total(self):
+        return sum(self.timings.values())
+
+
+class FrameProfiler:
+    """Per-stage frame timings with a rolling window of recent frames
+
+    Call begin_frame() at the top of the loop, mark(stage) after each stage
+    (the time since the previous mark is charged to that stage) and
+    end_frame() at the bottom. Stages marked several times in one frame add
+    up. With csv_path set, every frame's timings are also written out in ms.
+    """
+
+    def __init__(self, stages, window=240, csv_path=None):
+        self.stages = list(stages)
+        self.samples = {stage: deque(maxlen=window) for stage in self.stages + ['frame']}
+        self.frames = 0
+        self._current = dict.fromkeys(self.stages, 0.0)
+        self._frame_start = self._last = time.perf_counter()
+
+        self._csv_file = None
+        self._csv_writer = None
+        if csv_path:
+            self._csv_file = open(csv_path, 'w', newline='')
+            self._csv_writer = csv.writer(self._csv_file)
+            self._csv_writer.writerow(['frame'] + self.stages + ['frame_total'])
+
+    def begin_frame(self):
+        self._current = dict.fromkeys(self.stages, 0.0)
+        self._frame_start = self._last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self._current[stage] += now - self._last
+        self._last = now
+
+    def end_frame(self):
+        total = self._last - self._frame_start
+        for stage, seconds in self._current.items():
+            self.samples[stage].append(seconds)
+        self.samples['frame'].append(total)
+
+        if self._csv_writer is not None:
+            self._csv_writer.writerow(
+                [self.frames] + [f"{self._current[stage] * 1000:.3f}" for stage in self.stages]
+                + [f"{total * 1000:.3f}"]
+            )
+        self.frames += 1
+
+    def summary(self):
+        """(stage, p50, p95, max) in milliseconds over the rolling window"""
+        rows = []
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            values = np.fromiter(samples, dtype=np.float64, count=len(samples)) * 1000
+            p50, p95 = np.percentile(values, [50, 95])
+            rows.append((stage, p50, p95, values.max()))
+        return rows
+
+    def report(self):
+        """Multi-line text version of summary() for the console"""
+        lines = [f"    {'stage':<12}{'p50':>8}{'p95':>8}{'max':>8}  (ms)"]
+        for stage, p50, p95, worst in self.summary():
+            lines.append(f"    {stage:<12}{p50:8.2f}{p95:8.2f}{worst:8.2f}")
+        return "\n".join(lines)
+
+    def close(self):
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = None
+            self._csv_writer = None
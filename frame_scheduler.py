@@ -0,0 +1,88 @@
+"""Redraw-on-change frame pacing: what part of the window changed, and how long the loop may sleep"""
+import pygame
+
+# Blink period of the PAUSE badge, shared so idle waits wake exactly on a toggle
+BLINK_MS = 400
+
+
+def set_display_mode(size, vsync=False):
+    """Open the window, with vsync when asked for and the driver supports it"""
+    if vsync:
+        try:
+            return pygame.display.set_mode(size, vsync=1)
+        except pygame.error as e:
+            print(f"    WARNING: vsync unavailable ({e}), falling back to the frame cap")
+    return pygame.display.set_mode(size)
+
+
+def blink_on(ticks):
+    return (ticks // BLINK_MS) % 2
+
+
+def until_blink(ticks):
+    """Milliseconds until the PAUSE badge next toggles"""
+    return BLINK_MS - ticks % BLINK_MS
+
+
+class FrameScheduler:
+    """Tracks what is on screen so the loop only draws and presents what changed
+
+    Each iteration the loop describes the frame as named parts, each with a key
+    and the canvas rect it covers (None = the whole canvas):
+
+        scheduler.track('frame', (race_time, speed_multiplier))
+        scheduler.track('pause', blink, PAUSE_RECT)
+
+    take_dirty() returns the canvas rects whose key changed since the last
+    call, or [] when the frame on screen is still correct. The loop then
+    skips drawing and calls idle() instead of tick(), so a paused replay
+    sleeps on the event queue rather than spinning at the frame cap.
+    """
+
+    def __init__(self, canvas_size, fps=60, idle_poll_ms=100):
+        self.full = pygame.Rect((0, 0), canvas_size)
+        self.fps = fps
+        self.idle_poll_ms = idle_poll_ms
+        self.drawn = 0
+        self.skipped = 0
+        self._keys = {}
+        self._dirty = []
+
+    def track(self, part, key, rect=None):
+        if part in self._keys and self._keys[part] == key:
+            return
+        self._keys[part] = key
+        self._dirty.append(self.full if rect is None else pygame.Rect(rect))
+
+    def invalidate(self):
+        """Force a full redraw (window exposed, resized, ...)"""
+        self._dirty.append(self.full)
+
+    def take_dirty(self):
+        """Changed canvas rects since the last call; a single full rect if anything changed everywhere"""
+        dirty = [self.full] if self.full in self._dirty else self._dirty
+        self._dirty = []
+        if dirty:
+            self.drawn += 1
+        else:
+            self.skipped += 1
+        return dirty
+
+    def tick(self, clock):
+        """Pace a drawn frame: FPS cap, or none when fps is 0 (uncapped, or paced by vsync)"""
+        clock.tick(self.fps)
+
+    def idle(self, wake_ms=None):
+        """Sleep until an event arrives or wake_ms passes (a blink toggle, background work)
+
+        The waking event is put back on the queue for the loop's own handler.
+        """
+        timeout = self.idle_poll_ms if wake_ms is None else wake_ms
+        event = pygame.event.wait(max(int(timeout), 1))
+        if event.type != pygame.NOEVENT:
+            pygame.event.post(event)
+
+    def stats(self):
+        total = self.drawn + self.skipped
+        return f"{self.drawn} drawn, {self.skipped} idle wakeups" + (
+            f" ({self.skipped / total * 100:.0f}% idle)" if total else "")
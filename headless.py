@@ -0,0 +1,97 @@
+"""Offline replay export: renders frames without a display, split across processes"""
+import multiprocessing
+import os
+import subprocess
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Frames handed to a worker at a time
+CHUNK_FRAMES = 8
+
+# Frame renderer shared with forked pool workers; set just before the pool starts
+_render_frame = None
+
+
+def use_dummy_display():
+    """Route SDL to its dummy video driver; call before pygame.init()"""
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+
+def _render_chunk(task):
+    """Pool task: render a contiguous frame range to PNG files or raw RGB bytes"""
+    import pygame
+
+    start, stop, out_dir = task
+    raw_frames = []
+    for frame in range(start, stop):
+        surface = _render_frame(frame)
+        if out_dir is not None:
+            pygame.image.save(surface, os.path.join(out_dir, f"frame_{frame:06d}.png"))
+        else:
+            raw_frames.append(pygame.image.tobytes(surface, 'RGB'))
+    return stop - start, b"".join(raw_frames)
+
+
+def export_frames(render_frame, num_frames, size, out_dir=None, video=None, fps=30, workers=1):
+    """Render num_frames frames with render_frame(i) -> Surface and write them out
+
+    Frames go to out_dir as a PNG sequence, or are piped in order to ffmpeg to
+    encode `video`. With workers > 1 frame ranges are rendered by forked
+    processes, which inherit the loaded race and pre-rendered layers.
+    """
+    global _render_frame
+
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+
+    encoder = None
+    if video is not None:
+        width, height = size
+        encoder = subprocess.Popen(
+            ['ffmpeg', '-y', '-loglevel', 'error',
+             '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f"{width}x{height}", '-r', str(fps),
+             '-i', '-', '-pix_fmt', 'yuv420p', video],
+            stdin=subprocess.PIPE,
+        )
+
+    tasks = [(start, min(start + CHUNK_FRAMES, num_frames), out_dir)
+             for start in range(0, num_frames, CHUNK_FRAMES)]
+
+    if workers > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+        print("    (Process pool needs fork support, rendering on one core)")
+        workers = 1
+
+    done = 0
+
+    def write(result):
+        nonlocal done
+        count, raw = result
+        if encoder is not None:
+            encoder.stdin.write(raw)
+        done += count
+        if done % (CHUNK_FRAMES * 50) < count or done == num_frames:
+            print(f"    Rendered {done}/{num_frames} frames")
+
+    _render_frame = render_frame
+    try:
+        if workers <= 1:
+            for task in tasks:
+                write(_render_chunk(task))
+        else:
+            # Results are written in submission order, which keeps the video in
+            # sequence; only a couple of chunks per worker are in flight at once
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context('fork')) as pool:
+                pending = deque()
+                for task in tasks:
+                    pending.append(pool.submit(_render_chunk, task))
+                    if len(pending) >= 2 * workers:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+    finally:
+        _render_frame = None
+        if encoder is not None:
+            encoder.stdin.close()
+            encoder.wait()
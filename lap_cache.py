@@ -0,0 +1,91 @@
+"""Least-recently-used cache of per-lap render data for the single-lap viewer"""
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+
+def entry_nbytes(entry):
+    """Approximate memory held by a prepared lap: numpy buffers plus lists and their items"""
+    total = 0
+    for value in entry.values():
+        if isinstance(value, np.ndarray):
+            total += value.nbytes
+        elif isinstance(value, list):
+            total += sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value)
+    return total
+
+
+class LapCache:
+    """Per-lap render data, prepared on first view and kept under a memory budget
+
+    prepare(lap) turns one entry of split_laps() into what a frame needs: a
+    dict of numpy arrays, lists and plain values. The least recently viewed laps are
+    dropped once the prepared arrays take more than max_bytes; the lap being
+    viewed is never dropped.
+    """
+
+    def __init__(self, laps, prepare, max_bytes=64 * 1024 * 1024):
+        self.laps = laps
+        self.prepare = prepare
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.prepared = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+
+    def _load(self, index):
+        entry = self.prepare(self.laps[index])
+        self.prepared += 1
+        size = entry_nbytes(entry)
+        self._entries[index] = entry
+        self._sizes[index] = size
+        self.nbytes += size
+        return entry
+
+    def _evict(self, keep):
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            index = next(iter(self._entries))
+            if index == keep:
+                self._entries.move_to_end(index)
+                index = next(iter(self._entries))
+            del self._entries[index]
+            self.nbytes -= self._sizes.pop(index)
+            self.evictions += 1
+
+    def get(self, index):
+        """Prepared data for lap index, preparing it on a miss"""
+        entry = self._entries.get(index)
+        if entry is not None:
+            self._entries.move_to_end(index)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        entry = self._load(index)
+        self._evict(keep=index)
+        return entry
+
+    def prefetch(self, index, current):
+        """Prepare lap index ahead of time (e.g. a neighbour of the current lap)
+
+        The prefetched lap counts as just viewed, so laps viewed longer ago
+        make room for it; current is never dropped.
+        """
+        index %= len(self.laps)
+        if index in self._entries:
+            return
+        self._load(index)
+        self._evict(keep=current)
+
+    def __contains__(self, index):
+        return index in self._entries
+
+    def stats(self):
+        """Laps held, their size against max_bytes, and how often laps were prepared or evicted"""
+        return (f"{len(self._entries)}/{len(self.laps)} laps, "
+                f"{self.nbytes / (1024 * 1024):.1f}/{self.max_bytes / (1024 * 1024):.0f} MB, "
+                f"{self.prepared} prepared ({self.misses} on view), {self.evictions} evicted")
@@ -0,0 +1,78 @@
+import sys
+
+import pygame
+
+from retro_render import present
+
+SPINNER = "|/-\\"
+
+# Console status marks the bitmap-style fonts have no glyphs for
+SCREEN_MARKS = str.maketrans({"✓": "OK", "✗": "X"})
+
+
+def draw_loading_screen(canvas, fonts, colors, title, snapshot, ticks):
+    """Retro progress screen for a LoadProgress snapshot
+
+    fonts is (large, small, tiny). The bar fills by laps processed once the
+    lap count is known, and sweeps back and forth before that (cache read,
+    session download).
+    """
+    font_large, font_small, font_tiny = fonts
+    width, height = canvas.get_size()
+    canvas.fill(colors['bg_dark'])
+
+    title_text = font_large.render(title, True, colors['text_yellow'])
+    canvas.blit(title_text, ((width - title_text.get_width()) // 2, 70))
+
+    spinner = SPINNER[(ticks // 150) % len(SPINNER)]
+    status_text = font_small.render(f"{snapshot['status'].upper()} {spinner}", True, colors['text_cyan'])
+    canvas.blit(status_text, ((width - status_text.get_width()) // 2, 120))
+
+    # Progress bar
+    bar_w, bar_h = width - 160, 14
+    bar_x, bar_y = 80, 160
+    pygame.draw.rect(canvas, colors['panel_border'], (bar_x - 2, bar_y - 2, bar_w + 4, bar_h + 4), 2)
+    if snapshot['laps_total']:
+        fraction = min(snapshot['laps_done'] / snapshot['laps_total'], 1.0)
+        pygame.draw.rect(canvas, colors['text_cyan'], (bar_x, bar_y, int(bar_w * fraction), bar_h))
+        counter = f"LAPS {snapshot['laps_done']}/{snapshot['laps_total']}  {fraction * 100:.0f}%"
+    else:
+        sweep = bar_w // 5
+        phase = (ticks // 8) % (2 * (bar_w - sweep))
+        offset = phase if phase < bar_w - sweep else 2 * (bar_w - sweep) - phase
+        pygame.draw.rect(canvas, colors['text_cyan'], (bar_x + offset, bar_y, sweep, bar_h))
+        counter = ""
+
+    minutes, seconds = divmod(int(snapshot['elapsed']), 60)
+    info_text = font_tiny.render(f"{counter}  {minutes:d}:{seconds:02d}".strip(), True, colors['text_white'])
+    canvas.blit(info_text, ((width - info_text.get_width()) // 2, bar_y + bar_h + 10))
+
+    # Most recent log lines, oldest first
+    line_y = 230
+    for line in snapshot['lines']:
+        canvas.blit(font_tiny.render(line.translate(SCREEN_MARKS), True, colors['text_dim']), (bar_x, line_y))
+        line_y += 16
+
+
+def run_loading_screen(loader, screen, canvas, clock, fonts, colors, title, fps=30):
+    """Start a BackgroundLoad (or RaceStream) and show its progress until it is ready
+
+    The window keeps handling events meanwhile; closing it cancels the load
+    and exits. Returns the loader's result or re-raises its error.
+    """
+    loader.start()
+    while not loader.ready.is_set():
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                loader.progress.cancel()
+                pygame.quit()
+                sys.exit()
+
+        draw_loading_screen(canvas, fonts, colors, title, loader.progress.snapshot(), pygame.time.get_ticks())
+        present(canvas, screen)
+        pygame.display.flip()
+        clock.tick(fps)
+
+    if loader.error is not None:
+        raise loader.error
+    return loader.result
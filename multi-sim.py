@@ -1,133 +1,84 @@
 import numpy as np
-import pandas as pd
-import fastf1 as ff1
 import sys
 import os
+import zlib
 from datetime import timedelta
 
+from frame_profiler import FrameProfiler, LoadTimer
+from race_cache import session_key
+from race_data import BackgroundLoad, RaceStream, event_round, load_race
+from race_library import RaceLibrary
+from race_timeline import EVENT_KINDS, LeaderboardTable, RaceEventIndex, RaceTimeline, UniformRaceGrid
+
 # Parameters
 year = 2025
 wknd = 9
 ses = "R"
 drivers = ["HAM", "VER", "LEC"]
+workers = os.cpu_count() or 1  # Processes for uncached drivers when not streaming (1 = sequential)
+resample_hz = None  # e.g. 25 to resample all drivers onto a shared uniform clock
+leaderboard_csv = None  # e.g. "leaderboard.csv" to export the precomputed running order
+stream_laps = 3  # Start playback once this many laps of every uncached driver are in (None = load all first)
+profile_csv = None  # e.g. "frames.csv" to dump per-frame stage timings (F3 toggles the overlay)
+library_mb = 512  # Memory budget for races kept resident after switching away (L opens the library)
+event_lead_in = 3.0  # Seconds before an event that N/B (and scrubber clicks on a tick) land, so it plays out
+
+# Headless export: set export_dir (PNG sequence) or export_video (needs ffmpeg)
+# to render the replay offline instead of opening a window
+export_dir = None
+export_video = None
+export_fps = 30
+export_speed = 5.0  # Race seconds per real second, like speed_multiplier
+export_start = 0.0
+export_end = None  # Race time to stop at (None = end of race)
+export_workers = os.cpu_count() or 1
+
+# Command line overrides (python multi-sim.py --help); without arguments the parameters above apply
+from race_cli import add_export_args, simulator_parser
+parser = simulator_parser("multi-sim.py", "RACE ORACLE - F1 race replay", year, wknd, ses, speed=5.0)
+parser.add_argument('--drivers', nargs='+', default=drivers, help="driver codes (default %(default)s)")
+parser.add_argument('--stream-laps', type=int, default=stream_laps or 0,
+                    help="start playback once this many laps of every uncached driver are in; "
+                         "0 loads everything first (default %(default)s)")
+parser.add_argument('--workers', type=int, default=workers,
+                    help="processes for uncached drivers when loading everything first "
+                         "(--stream-laps 0 or headless export); streaming uses one (default %(default)s)")
+export = add_export_args(parser, export_fps, export_speed, export_workers)
+export.add_argument('--export-start', type=float, default=export_start, help="race time to start at (default %(default)s)")
+export.add_argument('--export-end', type=float, default=export_end, help="race time to stop at (default: the end)")
+args = parser.parse_args()
+year, wknd, ses, drivers, workers = args.year, args.event, args.session, args.drivers, args.workers
+wknd = event_round(year, wknd)
+stream_laps = args.stream_laps or None
+profile_csv = args.profile_csv or profile_csv
+export_dir = args.export_dir or export_dir
+export_video = args.export_video or export_video
+export_fps, export_speed, export_workers = args.export_fps, args.export_speed, args.export_workers
+export_start, export_end = args.export_start, args.export_end
 
 # ============================================================
-# STEP 1: LOAD ALL F1 DATA BEFORE INITIALIZING PYGAME
+# STEP 1: OPEN THE WINDOW, THEN LOAD F1 DATA IN THE BACKGROUND
 # ============================================================
 
 print("=" * 60)
 print("RACE ORACLE - F1 RACE REPLAY")
 print("=" * 60)
 
-# Load session
-print(">>> Step 1: Loading F1 session data...")
-print("    (This may take several minutes on first run)")
-session = ff1.get_session(year, wknd, ses)
-session.load()
-
-# Get event name
-event_info = session.event
-if hasattr(event_info, 'EventName'):
-    event_name = str(event_info.EventName)
-elif hasattr(event_info, 'Location'):
-    event_name = str(event_info.Location)
-else:
-    event_name = "RACE"
-
-print(f">>> Step 2: Processing race data for {event_name}...")
-
-# Load complete race timeline for each driver
-driver_data = {}
-all_x = []
-all_y = []
-lap_distances = {}
-
-for driver in drivers:
-    print(f"    Loading {driver}...", end=" ", flush=True)
-    try:
-        laps = session.laps.pick_drivers(driver)
-        
-        if len(laps) > 0:
-            all_telemetry = []
-            cumulative_time = 0
-            lap_distance_list = []
-            
-            for lap_num, lap in laps.iterlaps():
-                try:
-                    tel = lap.get_car_data().add_distance()
-                    pos = lap.get_pos_data()
-                    
-                    lap_time = lap['LapTime']
-                    if pd.isna(lap_time):
-                        continue
-                    
-                    lap_duration = lap_time.total_seconds()
-                    tel_data = pd.merge(tel, pos, left_index=True, right_index=True, how='inner')
-                    
-                    if len(tel_data) == 0:
-                        continue
-                    
-                    # Get max distance for this lap
-                    lap_length = tel_data['Distance'].max()
-                    lap_distance_list.append(lap_length)
-                    
-                    num_points = len(tel_data)
-                    time_per_point = lap_duration / num_points
-                    
-                    for idx, row in tel_data.iterrows():
-                        all_telemetry.append({
-                            'time': cumulative_time + (idx * time_per_point),
-                            'x': row['X'],
-                            'y': row['Y'],
-                            'speed': row['Speed'],
-                            'distance': row['Distance'],
-                            'lap': lap_num
-                        })
-                    
-                    cumulative_time += lap_duration
-                    
-                except Exception as e:
-                    continue
-            
-            if all_telemetry:
-                telemetry_df = pd.DataFrame(all_telemetry)
-                
-                driver_data[driver] = {
-                    'telemetry': telemetry_df,
-                    'total_time': cumulative_time
-                }
-                
-                lap_distances[driver] = lap_distance_list
-                
-                all_x.extend(telemetry_df['x'].values)
-                all_y.extend(telemetry_df['y'].values)
-                
-                print(f"✓ ({len(laps)} laps, {cumulative_time:.1f}s)")
-        
-    except Exception as e:
-        print(f"✗ Failed: {e}")
-
-if not driver_data:
-    print("\n>>> ERROR: No driver data loaded!")
-    sys.exit(1)
+loading = LoadTimer()
 
-# Calculate average lap distance
-avg_lap_distance = np.mean([dist for distances in lap_distances.values() for dist in distances])
+loading.stage("Step 1: Initializing graphics")
+headless_export = export_dir is not None or export_video is not None
+if headless_export:
+    from headless import export_frames, use_dummy_display
+    use_dummy_display()
 
-# Find maximum race duration
-max_race_time = max([data['total_time'] for data in driver_data.values()])
-
-print(f"\n>>> Step 3: Data processing complete!")
-print(f"    Average lap distance: {avg_lap_distance:.1f}m")
-print(f"    Race duration: {max_race_time/60:.1f} minutes")
-
-# ============================================================
-# STEP 2: NOW INITIALIZE PYGAME AND GRAPHICS
-# ============================================================
-
-print("\n>>> Step 4: Initializing graphics...")
 import pygame
 
+from frame_scheduler import FrameScheduler, blink_on, set_display_mode, until_blink
+from loading_screen import run_loading_screen
+from retro_render import (TextCache, build_car_sprite, build_controls_box, build_pause_badge,
+                          build_profile_overlay, build_scanlines, present, present_rects)
+
 pygame.init()
 
 # Screen settings
@@ -135,28 +86,20 @@ NATIVE_WIDTH, NATIVE_HEIGHT = 640, 400
 SCALE_FACTOR = 2
 WIDTH = NATIVE_WIDTH * SCALE_FACTOR
 HEIGHT = NATIVE_HEIGHT * SCALE_FACTOR
-
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
+FPS = 60  # The frame loop is light enough to run at 144 on high-refresh displays; 0 = uncapped
+VSYNC = False  # Pace playback by the display refresh (pair with FPS = 0)
+if args.scale:
+    SCALE_FACTOR = args.scale
+    WIDTH, HEIGHT = NATIVE_WIDTH * SCALE_FACTOR, NATIVE_HEIGHT * SCALE_FACTOR
+if args.fps is not None:
+    FPS = args.fps
+VSYNC = VSYNC or args.vsync
+
+screen = set_display_mode((WIDTH, HEIGHT), VSYNC)
 canvas = pygame.Surface((NATIVE_WIDTH, NATIVE_HEIGHT))
 pygame.display.set_caption(f"RACE ORACLE - RACE REPLAY")
 clock = pygame.time.Clock()
 
-# Driver colors
-DRIVER_COLORS = {
-    'HAM': (0, 200, 200),
-    'VER': (30, 65, 255),
-    'LEC': (220, 0, 0),
-    'NOR': (255, 135, 0),
-    'SAI': (220, 0, 0),
-    'PER': (30, 65, 255),
-    'RUS': (0, 200, 200),
-    'ALO': (0, 120, 40),
-}
-
-# Add color to driver data
-for driver, data in driver_data.items():
-    data['color'] = DRIVER_COLORS.get(driver, (255, 255, 255))
-
 # Retro color palette
 COLORS = {
     'bg_dark': (5, 5, 15),
@@ -174,13 +117,67 @@ COLORS = {
     'scanline': (0, 0, 0, 80),
 }
 
+# Fonts
+font_large = pygame.font.SysFont('courier', 24, bold=True)
+font_med = pygame.font.SysFont('courier', 20, bold=True)
+font_small = pygame.font.SysFont('courier', 16, bold=True)
+font_tiny = pygame.font.SysFont('courier', 12, bold=True)
+
+# Load session (processed timelines come from the local cache when available).
+# The window stays responsive on a progress screen while this runs.
+# With stream_laps set, uncached drivers keep processing lap by lap during playback.
+loading.stage("Step 2: Loading race data")
+race_stream = None
+if headless_export:
+    event_name, timelines = load_race(year, wknd, ses, drivers, workers)
+elif stream_laps:
+    race_stream = RaceStream(year, wknd, ses, drivers, stream_laps)
+    event_name, timelines = run_loading_screen(
+        race_stream, screen, canvas, clock,
+        (font_large, font_small, font_tiny), COLORS, "RACE ORACLE",
+    )
+else:
+    event_name, timelines = run_loading_screen(
+        BackgroundLoad(year, wknd, ses, drivers, workers), screen, canvas, clock,
+        (font_large, font_small, font_tiny), COLORS, "RACE ORACLE",
+    )
+
+# ============================================================
+# STEP 2: PREPARE THE RACE TIMELINE
+# ============================================================
+
+# Driver colors
+DRIVER_COLORS = {
+    'HAM': (0, 200, 200),
+    'VER': (30, 65, 255),
+    'LEC': (220, 0, 0),
+    'NOR': (255, 135, 0),
+    'SAI': (220, 0, 0),
+    'PER': (30, 65, 255),
+    'RUS': (0, 200, 200),
+    'ALO': (0, 120, 40),
+}
+
+# Drivers missing above get one of these, picked from their code so it never changes between races
+FALLBACK_COLORS = [
+    (255, 100, 255), (255, 255, 100), (100, 255, 120), (255, 160, 160), (160, 120, 255),
+    (255, 200, 60), (60, 160, 255), (180, 255, 60), (255, 90, 150), (120, 220, 200),
+    (200, 140, 80), (150, 200, 255),
+]
+
+def driver_color(driver):
+    """Team color for known drivers, otherwise a stable pick from FALLBACK_COLORS"""
+    if driver in DRIVER_COLORS:
+        return DRIVER_COLORS[driver]
+    return FALLBACK_COLORS[zlib.crc32(driver.encode()) % len(FALLBACK_COLORS)]
+
 # Layout
 MAP_WIDTH = 480
 PANEL_WIDTH = NATIVE_WIDTH - MAP_WIDTH
 PANEL_X = MAP_WIDTH
 
 # Load circuit background
-print(">>> Step 5: Loading circuit map...")
+loading.stage("Step 3: Loading circuit map")
 try:
     circuit_img = pygame.image.load('circuit.png')
     
@@ -203,13 +200,10 @@ except Exception as e:
     print(f"    WARNING: Could not load circuit.png: {e}")
     circuit_img = None
 
-# Fonts
-font_large = pygame.font.SysFont('courier', 24, bold=True)
-font_med = pygame.font.SysFont('courier', 20, bold=True)
-font_small = pygame.font.SysFont('courier', 16, bold=True)
-font_tiny = pygame.font.SysFont('courier', 12, bold=True)
+# Rendered text and number glyphs, reused across frames
+text_cache = TextCache()
 
-# Global normalization parameters
+# Global normalization parameters (those of the race on screen)
 track_x_min = None
 track_x_max = None
 track_y_min = None
@@ -218,13 +212,10 @@ track_scale = None
 track_x_offset = None
 track_y_offset = None
 
-def normalize_coords_single(x, y):
-    """Normalize a single coordinate using global track parameters"""
-    if track_scale is None:
-        return 0, 0
-    
-    x_scaled = int((x - track_x_min) * track_scale + track_x_offset)
-    y_scaled = int((y - track_y_min) * track_scale + track_y_offset)
+def normalize_coords(x, y):
+    """Normalize coordinate arrays using global track parameters"""
+    x_scaled = ((x - track_x_min) * track_scale + track_x_offset).astype(int)
+    y_scaled = ((y - track_y_min) * track_scale + track_y_offset).astype(int)
     
     return x_scaled, y_scaled
 
@@ -249,263 +240,385 @@ def setup_normalization(all_x, all_y, margin=30):
     track_x_offset = (MAP_WIDTH - x_scaled_range) / 2
     track_y_offset = (NATIVE_HEIGHT - y_scaled_range) / 2
 
-# Setup normalization
-setup_normalization(np.array(all_x), np.array(all_y))
+def build_race_tables(timelines):
+    """Packed timeline (optionally resampled), precomputed leaderboard and event index for the given drivers"""
+    # All drivers packed for one vectorized state query per frame
+    race_timeline = RaceTimeline(
+        timelines.keys(),
+        {driver: timeline['telemetry'] for driver, timeline in timelines.items()},
+        normalize_coords,
+    )
+    leaderboard = LeaderboardTable(race_timeline)
+    race_events = RaceEventIndex(race_timeline, leaderboard)
+    if resample_hz:
+        race_timeline = UniformRaceGrid(race_timeline, resample_hz)
+    return race_timeline, leaderboard, race_events
+
+def export_leaderboard():
+    leaderboard.to_dataframe().to_csv(leaderboard_csv, index=False)
+    print(f"    Leaderboard table written to {leaderboard_csv}")
+
+# ============================================================
+# STATIC LAYERS (rendered once, blitted every frame)
+# ============================================================
+
+loading.stage("Step 4: Pre-rendering static layers")
+
+# Map background plus the right panel chrome; the event name goes on per race
+static_base = pygame.Surface((NATIVE_WIDTH, NATIVE_HEIGHT))
+static_base.fill(COLORS['bg_dark'])
+if circuit_img is not None:
+    static_base.blit(circuit_img, (circuit_x, circuit_y))
+
+pygame.draw.rect(static_base, COLORS['panel_bg'], (PANEL_X, 0, PANEL_WIDTH, NATIVE_HEIGHT))
+pygame.draw.line(static_base, COLORS['panel_border'], (PANEL_X, 0), (PANEL_X, NATIVE_HEIGHT), 3)
+
+y_pos = 16
+title = font_large.render("RACE", True, COLORS['text_yellow'])
+static_base.blit(title, (PANEL_X + 10, y_pos))
+y_pos += 28
+
+EVENT_NAME_POS = (PANEL_X + 10, y_pos)
+y_pos += 24
+
+pygame.draw.line(static_base, COLORS['panel_border'], 
+                (PANEL_X + 6, y_pos), (PANEL_X + PANEL_WIDTH - 6, y_pos), 2)
+y_pos += 12
+
+time_label = font_small.render("TIME", True, COLORS['text_dim'])
+static_base.blit(time_label, (PANEL_X + 10, y_pos))
+y_pos += 18
+TIME_VALUE_POS = (PANEL_X + 10, y_pos)
+y_pos += 28
+
+multi_label = font_small.render("SPEED", True, COLORS['text_dim'])
+static_base.blit(multi_label, (PANEL_X + 10, y_pos))
+y_pos += 18
+SPEED_VALUE_POS = (PANEL_X + 10, y_pos)
+y_pos += 28
+
+events_label = font_small.render("EVENTS", True, COLORS['text_dim'])
+static_base.blit(events_label, (PANEL_X + 10, y_pos))
+EVENT_FILTER_POS = (PANEL_X + 20 + events_label.get_width(), y_pos + 2)
+y_pos += 20
+SCRUBBER_RECT = pygame.Rect(PANEL_X + 10, y_pos, PANEL_WIDTH - 20, 14)
+y_pos += 20
+NEXT_EVENT_POS = (PANEL_X + 10, y_pos)
+
+# Panel strip re-blitted after the cars so labels near the edge stay under it
+PANEL_AREA = pygame.Rect(PANEL_X - 1, 0, NATIVE_WIDTH - PANEL_X + 1, NATIVE_HEIGHT)
+
+# Leaderboard placement; its backdrop is sized per race for the full field
+LEADERBOARD_X, LEADERBOARD_Y, LEADERBOARD_WIDTH = 10, 10, 150
+lb_title = font_small.render("LEADERBOARD", True, COLORS['text_yellow'])
+
+# Controls box, pause badge and CRT scanlines
+controls_box = build_controls_box((10, NATIVE_HEIGHT - 106 - 10), 140, 106, font_tiny, COLORS, [
+    "PAUSE - Space",
+    "SKIP - Left/Right",
+    "SPEED - Up/Down",
+    "RESET - R",
+    "LIBRARY - L",
+    "EVENTS - N/B, E"
+])
+pause_badge = build_pause_badge(font_large, COLORS)
+PAUSE_RECT = pause_badge.get_rect(topleft=(MAP_WIDTH // 2 - 50, 20))
+buffering_text = font_small.render("BUFFERING", True, COLORS['text_magenta'])
+scanlines = build_scanlines((NATIVE_WIDTH, NATIVE_HEIGHT), COLORS['scanline'])
+
+# Race library menu backdrop (over the map)
+LIBRARY_RECT = pygame.Rect(30, 30, MAP_WIDTH - 60, NATIVE_HEIGHT - 60)
+LIBRARY_ROWS = 16
+library_bg = pygame.Surface(LIBRARY_RECT.size, pygame.SRCALPHA)
+library_bg.fill((*COLORS['leaderboard_bg'], 245))
+pygame.draw.rect(library_bg, COLORS['leaderboard_border'], library_bg.get_rect(), 2)
+library_title = font_small.render("RACE LIBRARY", True, COLORS['text_yellow'])
+library_help = font_tiny.render("ENTER - Load   ESC - Close", True, COLORS['text_dim'])
+
+# Event navigation: N/B jump between events of the kinds E selects; the scrubber marks them
+EVENT_FILTERS = (None,) + EVENT_KINDS
+EVENT_FILTER_NAMES = {None: "ALL", 'overtake': "PASSES", 'pit': "PITS", 'leader_lap': "LEADER", 'lap': "LAPS"}
+EVENT_COLORS = {
+    'overtake': COLORS['text_cyan'],
+    'pit': COLORS['text_magenta'],
+    'leader_lap': COLORS['text_yellow'],
+    'lap': COLORS['text_dim'],
+}
+SCRUBBER_SPAN = SCRUBBER_RECT.width - 5  # Pixels between race start and end inside the border
+scrubber_key = None
+scrubber_bar = None
+
+def build_scrubber(events, kind, race_length):
+    """Scrubber bar with a tick per event of the given kind (None = all), rarest kinds on top"""
+    bar = pygame.Surface(SCRUBBER_RECT.size)
+    bar.fill(COLORS['bg_dark'])
+    for tick_kind in ('lap', 'leader_lap', 'overtake', 'pit'):
+        if kind is not None and tick_kind != kind:
+            continue
+        times = events.times[events.kinds == EVENT_KINDS.index(tick_kind)]
+        xs = np.unique(2 + (np.minimum(times / race_length, 1.0) * SCRUBBER_SPAN).astype(int))
+        for x in xs:
+            pygame.draw.line(bar, EVENT_COLORS[tick_kind], (x, 2), (x, SCRUBBER_RECT.height - 3))
+    pygame.draw.rect(bar, COLORS['panel_border'], bar.get_rect(), 1)
+    return bar
+
+def scrubber_layer():
+    """Scrubber bar for the active race and filter, rebuilt only when either changes"""
+    global scrubber_key, scrubber_bar
+    key = (race_events, event_filter, max_race_time)
+    if key != scrubber_key:
+        scrubber_key, scrubber_bar = key, build_scrubber(race_events, event_filter, max_race_time)
+    return scrubber_bar
+
+def event_jump(t, forward):
+    """Race time to land on for the next/previous event of the current filter from t, or None
+
+    Jumps land event_lead_in seconds early, so the search runs from where the
+    last jump's event sits rather than from t itself.
+    """
+    anchor = t + event_lead_in
+    if forward:
+        row = race_events.next_after(anchor + 0.01, event_filter)
+    else:
+        row = race_events.previous_before(anchor - 0.5, event_filter)
+    if row is None:
+        return None
+    return min(max(race_events.times[row] - event_lead_in, 0.0), max_race_time)
+
+def scrubber_seek(x):
+    """Race time for a click at native x on the scrubber, snapping onto an event tick within 2 px"""
+    t = min(max((x - SCRUBBER_RECT.x - 2) / SCRUBBER_SPAN, 0.0), 1.0) * max_race_time
+    tolerance = 2 * max_race_time / SCRUBBER_SPAN
+    nearby = [race_events.next_after(t, event_filter), race_events.previous_before(t, event_filter)]
+    nearby = [race_events.times[row] for row in nearby if row is not None]
+    if nearby:
+        nearest = min(nearby, key=lambda event_time: abs(event_time - t))
+        if abs(nearest - t) <= tolerance:
+            return min(max(nearest - event_lead_in, 0.0), max_race_time)
+    return t
+
+def build_race_layers(event_name, driver_names, driver_colors):
+    """Panel with the event name, leaderboard backdrop and car sprites for one race"""
+    static_layer = static_base.copy()
+    event_display = event_name.split(' ')[0][:8] if ' ' in event_name else event_name[:8]
+    event_text = font_small.render(event_display.upper(), True, COLORS['text_cyan'])
+    static_layer.blit(event_text, EVENT_NAME_POS)
+    
+    # Leaderboard backdrop sized for the full field; each frame blits only the rows in use
+    leaderboard_bg = pygame.Surface((LEADERBOARD_WIDTH, 20 + len(driver_names) * 18 + 10), pygame.SRCALPHA)
+    leaderboard_bg.fill((*COLORS['leaderboard_bg'], 220))
+    
+    # Marker and name tag per driver, blitted in one batch each frame
+    car_sprites = [build_car_sprite(font_tiny, driver_name, color, COLORS['text_white'])
+                   for driver_name, color in zip(driver_names, driver_colors)]
+    
+    return static_layer, leaderboard_bg, car_sprites
 
-# CRT scanlines
-def apply_crt_effect(surface):
-    scanline_surface = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
-    for y in range(0, surface.get_height(), 2):
-        pygame.draw.line(scanline_surface, COLORS['scanline'], 
-                        (0, y), (surface.get_width(), y), 1)
-    surface.blit(scanline_surface, (0, 0))
+# ============================================================
+# RACES (prepared once per session, kept resident in the library)
+# ============================================================
 
-# Function to get driver position at specific time
-def get_position_at_time(driver_name, current_time):
-    """Get driver's position at a specific race time"""
-    data = driver_data[driver_name]
-    telemetry = data['telemetry']
+def prepare_race(event_name, timelines, loading):
+    """Everything the frame loop needs for one session, or None without driver data"""
+    loading.stage(f"Step 5: Preparing race timeline for {event_name}")
     
-    time_diff = abs(telemetry['time'] - current_time)
-    closest_idx = time_diff.idxmin()
+    # Load complete race timeline for each driver
+    driver_data = {}
+    all_x = []
+    all_y = []
+    lap_distances = {}
     
-    if time_diff.iloc[closest_idx] > 5.0:
+    for driver, timeline in timelines.items():
+        driver_data[driver] = timeline
+        lap_distances[driver] = timeline['lap_distances']
+        all_x.append(timeline['telemetry']['x'].values)
+        all_y.append(timeline['telemetry']['y'].values)
+    
+    if not driver_data:
+        loading.done()
+        print("\n>>> ERROR: No driver data loaded!")
         return None
     
-    row = telemetry.iloc[closest_idx]
+    # Calculate average lap distance
+    avg_lap_distance = np.mean([dist for distances in lap_distances.values() for dist in distances])
+    
+    # Find maximum race duration
+    max_race_time = max([data['total_time'] for data in driver_data.values()])
+    
+    loading.done()
+    print(f"\n>>> Step 6: Data processing complete!")
+    print(f"    Average lap distance: {avg_lap_distance:.1f}m")
+    print(f"    Race duration: {max_race_time/60:.1f} minutes")
     
-    # Calculate total race distance
-    lap_num = row['lap']
-    distance_in_lap = row['distance']
-    total_race_distance = ((lap_num - 1) * avg_lap_distance) + distance_in_lap
+    # Setup normalization
+    loading.stage("Normalizing track coordinates")
+    setup_normalization(np.concatenate(all_x), np.concatenate(all_y))
+    
+    loading.stage("Precomputing leaderboard" + (f" and {resample_hz} Hz grid" if resample_hz else ""))
+    race_timeline, leaderboard, race_events = build_race_tables(driver_data)
+    print(f"    {len(leaderboard.change_ticks)} running order changes")
+    print("    Events: " + ", ".join(f"{count} {kind}" for kind, count in race_events.counts().items()))
+    
+    driver_names = race_timeline.drivers
+    driver_colors = [driver_color(driver) for driver in driver_names]
+    static_layer, leaderboard_bg, car_sprites = build_race_layers(event_name, driver_names, driver_colors)
+    loading.done()
     
     return {
-        'x': row['x'],
-        'y': row['y'],
-        'speed': row['speed'],
-        'distance': distance_in_lap,
-        'total_distance': total_race_distance,
-        'lap': lap_num,
-        'time': row['time']
+        'event_name': event_name,
+        'timelines': timelines,
+        'max_race_time': max_race_time,
+        'track_extents': (track_x_min, track_x_max, track_y_min, track_y_max),
+        'race_timeline': race_timeline,
+        'leaderboard': leaderboard,
+        'race_events': race_events,
+        'driver_names': driver_names,
+        'driver_colors': driver_colors,
+        'static_layer': static_layer,
+        'leaderboard_bg': leaderboard_bg,
+        'car_sprites': car_sprites,
+        'race_time': 0.0,
     }
 
-# Animation state
-animation_running = True
-paused = False
-speed_multiplier = 5.0
-current_race_time = 0.0
-last_time = pygame.time.get_ticks()
+def activate_race(race):
+    """Point the frame loop (and the shared normalization) at a prepared race"""
+    global event_name, timelines, max_race_time, race_timeline, leaderboard, race_events
+    global driver_names, driver_colors, static_layer, leaderboard_bg, car_sprites
+    event_name = race['event_name']
+    timelines = race['timelines']
+    max_race_time = race['max_race_time']
+    race_timeline = race['race_timeline']
+    leaderboard = race['leaderboard']
+    race_events = race['race_events']
+    driver_names = race['driver_names']
+    driver_colors = race['driver_colors']
+    static_layer = race['static_layer']
+    leaderboard_bg = race['leaderboard_bg']
+    car_sprites = race['car_sprites']
+    x_min, x_max, y_min, y_max = race['track_extents']
+    setup_normalization(np.array([x_min, x_max]), np.array([y_min, y_max]))
+
+active_race = prepare_race(event_name, timelines, loading)
+if active_race is None:
+    sys.exit(1)
+activate_race(active_race)
+if leaderboard_csv and race_stream is None:
+    export_leaderboard()
 
-print("\n>>> RACE ORACLE READY - Starting simulation!")
-print("=" * 60)
+# Every cached session, switchable from the library menu; recent races stay resident
+library = RaceLibrary(library_mb * 1024 * 1024)
+active_key = session_key(year, wknd, ses)
+library.add(active_key, active_race)
+
+loading.done()
+print(f">>> Load complete in {loading.total():.2f}s")
+
+# Frame stage timings; F3 toggles the HUD, refreshed a few times a second
+profiler = FrameProfiler(
+    ['events', 'state', 'cars', 'leaderboard', 'panel', 'crt', 'overlay', 'scale', 'flip', 'wait'],
+    csv_path=profile_csv,
+)
+show_profiler = False
+profile_overlay = None
+
+# Only draw when something on screen changes; a paused replay sleeps between blinks
+scheduler = FrameScheduler((NATIVE_WIDTH, NATIVE_HEIGHT), FPS)
 
 # ============================================================
-# MAIN LOOP
+# FRAME RENDERING (shared by the window and headless export)
 # ============================================================
 
-while animation_running:
-    current_time = pygame.time.get_ticks()
-    dt = current_time - last_time
-    last_time = current_time
-    
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            animation_running = False
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_SPACE:
-                paused = not paused
-            elif event.key == pygame.K_RIGHT:
-                current_race_time = min(current_race_time + 10, max_race_time)
-            elif event.key == pygame.K_LEFT:
-                current_race_time = max(current_race_time - 10, 0)
-            elif event.key == pygame.K_UP:
-                speed_multiplier = min(speed_multiplier + 1, 20)
-            elif event.key == pygame.K_DOWN:
-                speed_multiplier = max(speed_multiplier - 1, 0.5)
-            elif event.key == pygame.K_r:
-                current_race_time = 0
-    
-    if not paused:
-        current_race_time += (dt / 1000.0) * speed_multiplier
-        if current_race_time >= max_race_time:
-            current_race_time = 0
-    
-    canvas.fill(COLORS['bg_dark'])
-    
-    # Draw circuit background
-    if circuit_img is not None:
-        canvas.blit(circuit_img, (circuit_x, circuit_y))
+def draw_frame(race_time, show_pause=False):
+    """Draw the replay at race_time onto the native-resolution canvas"""
+    # Background, circuit and panel chrome
+    canvas.blit(static_layer, (0, 0))
     
     try:
-        # Get positions for all drivers
-        driver_positions = []
-        
-        for driver_name, data in driver_data.items():
-            position = get_position_at_time(driver_name, current_race_time)
-            
-            if position is not None:
-                x_scaled, y_scaled = normalize_coords_single(position['x'], position['y'])
-                
-                driver_positions.append({
-                    'driver': driver_name,
-                    'x': x_scaled,
-                    'y': y_scaled,
-                    'speed': position['speed'],
-                    'distance': position['distance'],
-                    'total_distance': position['total_distance'],
-                    'lap': position['lap'],
-                    'time': position['time'],
-                    'color': data['color']
-                })
-        
-        # Sort by total race distance
-        driver_positions.sort(key=lambda x: x['total_distance'], reverse=True)
+        # Get state of all drivers; running order and gaps come from the precomputed table
+        state = race_timeline.state_at(race_time)
+        order, _, _ = leaderboard.at(race_time)
+        intervals = race_timeline.intervals(order, state['total_distance'], race_time)
+        profiler.mark('state')
         
-        # Calculate gaps
-        if len(driver_positions) > 0:
-            leader_distance = driver_positions[0]['total_distance']
-            for pos in driver_positions:
-                pos['gap'] = leader_distance - pos['total_distance']
-        
-        # Draw all drivers
-        for pos_data in driver_positions:
-            driver_color = pos_data['color']
-            x, y = pos_data['x'], pos_data['y']
-            
-            # Validate coordinates
-            if not (0 <= x < MAP_WIDTH and 0 <= y < NATIVE_HEIGHT):
-                continue
-            
-            # Draw car
-            pygame.draw.circle(canvas, driver_color, (int(x), int(y)), 7)
-            pygame.draw.circle(canvas, COLORS['text_white'], (int(x), int(y)), 7, 2)
-            
-            # Draw driver label
-            label = font_tiny.render(pos_data['driver'], True, driver_color)
-            label_bg = pygame.Surface((label.get_width() + 4, label.get_height()), pygame.SRCALPHA)
-            label_bg.fill((0, 0, 0, 180))
-            canvas.blit(label_bg, (int(x) - label.get_width()//2 - 2, int(y) - 18))
-            canvas.blit(label, (int(x) - label.get_width()//2, int(y) - 18))
+        # Draw all drivers on the map, in running order, as one batch of sprite blits
+        screen_x, screen_y = state['screen_x'], state['screen_y']
+        on_map = state['valid'] & (screen_x >= 0) & (screen_x < MAP_WIDTH) & (screen_y >= 0) & (screen_y < NATIVE_HEIGHT)
+        car_blits = []
+        for i in order:
+            if on_map[i]:
+                sprite, (dx, dy) = car_sprites[i]
+                car_blits.append((sprite, (int(screen_x[i]) + dx, int(screen_y[i]) + dy), None, pygame.BLEND_PREMULTIPLIED))
+        canvas.blits(car_blits, doreturn=False)
+        profiler.mark('cars')
         
         # === LEADERBOARD ===
-        leaderboard_width = 150
-        leaderboard_height = 20 + len(driver_positions) * 18 + 10
-        leaderboard_x = 10
-        leaderboard_y = 10
+        leaderboard_height = 20 + len(order) * 18 + 10
+        leaderboard_x = LEADERBOARD_X
+        leaderboard_y = LEADERBOARD_Y
 
-        leaderboard_bg = pygame.Surface((leaderboard_width, leaderboard_height), pygame.SRCALPHA)
-        leaderboard_bg.fill((*COLORS['leaderboard_bg'], 220))
-        canvas.blit(leaderboard_bg, (leaderboard_x, leaderboard_y))
+        canvas.blit(leaderboard_bg, (leaderboard_x, leaderboard_y), (0, 0, LEADERBOARD_WIDTH, leaderboard_height))
 
         pygame.draw.rect(canvas, COLORS['leaderboard_border'], 
-                        (leaderboard_x, leaderboard_y, leaderboard_width, leaderboard_height), 2)
+                        (leaderboard_x, leaderboard_y, LEADERBOARD_WIDTH, leaderboard_height), 2)
 
         lb_y = leaderboard_y + 8
-        lb_title = font_small.render("LEADERBOARD", True, COLORS['text_yellow'])
         canvas.blit(lb_title, (leaderboard_x + 8, lb_y))
         lb_y += 20
 
-        for idx, pos_data in enumerate(driver_positions):
-            pos_num = font_tiny.render(f"{idx+1}", True, COLORS['text_dim'])
+        for idx, i in enumerate(order):
+            pos_num = text_cache.render(font_tiny, f"{idx+1}", COLORS['text_dim'])
             canvas.blit(pos_num, (leaderboard_x + 8, lb_y))
             
-            pygame.draw.circle(canvas, pos_data['color'], (leaderboard_x + 25, lb_y + 6), 3)
+            pygame.draw.circle(canvas, driver_colors[i], (leaderboard_x + 25, lb_y + 6), 3)
             
-            driver_text = font_tiny.render(pos_data['driver'], True, COLORS['text_white'])
+            driver_text = text_cache.render(font_tiny, driver_names[i], COLORS['text_white'])
             canvas.blit(driver_text, (leaderboard_x + 35, lb_y))
             
-            # Show distance gap between positions in meters or kilometers
+            # Show time interval to the car ahead
             if idx == 0:
-                gap_text = font_tiny.render("LEAD", True, COLORS['text_yellow'])
+                canvas.blit(text_cache.render(font_tiny, "LEAD", COLORS['text_yellow']), (leaderboard_x + 75, lb_y))
             else:
-                gap_meters = driver_positions[idx - 1]['total_distance'] - pos_data['total_distance']
-                if gap_meters < 1000:
-                    gap_str = f"+{gap_meters:.0f}m"
+                interval = intervals[idx]
+                if interval < 60:
+                    gap_str = f"+{interval:.3f}s"
                 else:
-                    gap_str = f"+{gap_meters/1000:.1f}k"
-                gap_text = font_tiny.render(gap_str, True, COLORS['text_dim'])
-            canvas.blit(gap_text, (leaderboard_x + 75, lb_y))
+                    gap_str = f"+{interval:.1f}s"
+                text_cache.blit_number(canvas, font_tiny, gap_str, COLORS['text_dim'], (leaderboard_x + 75, lb_y))
             
             lb_y += 18
+        profiler.mark('leaderboard')
 
         
         # === RIGHT PANEL ===
-        pygame.draw.rect(canvas, COLORS['panel_bg'], (PANEL_X, 0, PANEL_WIDTH, NATIVE_HEIGHT))
-        pygame.draw.line(canvas, COLORS['panel_border'], (PANEL_X, 0), (PANEL_X, NATIVE_HEIGHT), 3)
-        
-        y_pos = 16
-        
-        title = font_large.render("RACE", True, COLORS['text_yellow'])
-        canvas.blit(title, (PANEL_X + 10, y_pos))
-        y_pos += 28
-        
-        event_display = event_name.split(' ')[0][:8] if ' ' in event_name else event_name[:8]
-        event_text = font_small.render(event_display.upper(), True, COLORS['text_cyan'])
-        canvas.blit(event_text, (PANEL_X + 10, y_pos))
-        y_pos += 24
-        
-        pygame.draw.line(canvas, COLORS['panel_border'], 
-                        (PANEL_X + 6, y_pos), (PANEL_X + PANEL_WIDTH - 6, y_pos), 2)
-        y_pos += 12
+        canvas.blit(static_layer, PANEL_AREA, PANEL_AREA)
         
         # Race time
-        time_label = font_small.render("TIME", True, COLORS['text_dim'])
-        canvas.blit(time_label, (PANEL_X + 10, y_pos))
-        y_pos += 18
-        
-        minutes = int(current_race_time // 60)
-        seconds = int(current_race_time % 60)
+        minutes = int(race_time // 60)
+        seconds = int(race_time % 60)
         time_str = f"{minutes:02d}:{seconds:02d}"
-        time_value = font_med.render(time_str, True, COLORS['text_white'])
-        canvas.blit(time_value, (PANEL_X + 10, y_pos))
-        y_pos += 28
+        text_cache.blit_number(canvas, font_med, time_str, COLORS['text_white'], TIME_VALUE_POS)
         
         # Animation speed
-        multi_label = font_small.render("SPEED", True, COLORS['text_dim'])
-        canvas.blit(multi_label, (PANEL_X + 10, y_pos))
-        y_pos += 18
-        multi_value = font_med.render(f"x{speed_multiplier:.1f}", True, COLORS['text_magenta'])
-        canvas.blit(multi_value, (PANEL_X + 10, y_pos))
-        
-        # === CONTROLS BOX ===
-        control_box_width = 140
-        control_box_height = 80
-        control_box_x = 10
-        control_box_y = NATIVE_HEIGHT - control_box_height - 10
-        
-        control_bg = pygame.Surface((control_box_width, control_box_height), pygame.SRCALPHA)
-        control_bg.fill((*COLORS['control_box_bg'], 200))
-        canvas.blit(control_bg, (control_box_x, control_box_y))
+        multi_value = text_cache.render(font_med, f"x{speed_multiplier:.1f}", COLORS['text_magenta'])
+        canvas.blit(multi_value, SPEED_VALUE_POS)
         
-        pygame.draw.rect(canvas, COLORS['control_box_border'], 
-                        (control_box_x, control_box_y, control_box_width, control_box_height), 2)
+        # Event scrubber with the playhead, and the event N jumps to
+        canvas.blit(text_cache.render(font_tiny, EVENT_FILTER_NAMES[event_filter], COLORS['text_cyan']), EVENT_FILTER_POS)
+        canvas.blit(scrubber_layer(), SCRUBBER_RECT)
+        playhead_x = SCRUBBER_RECT.x + 2 + int(min(race_time / max_race_time, 1.0) * SCRUBBER_SPAN)
+        pygame.draw.line(canvas, COLORS['text_white'], (playhead_x, SCRUBBER_RECT.top), (playhead_x, SCRUBBER_RECT.bottom - 1))
+        next_event = race_events.next_after(race_time + event_lead_in + 0.01, event_filter)
+        if next_event is not None:
+            next_color = EVENT_COLORS[EVENT_KINDS[race_events.kinds[next_event]]]
+            canvas.blit(text_cache.render(font_tiny, "> " + race_events.label(next_event), next_color), NEXT_EVENT_POS)
         
-        ctrl_y = control_box_y + 8
-        ctrl_x = control_box_x + 6
-        
-        ctrl_title = font_tiny.render("CONTROLS", True, COLORS['text_cyan'])
-        canvas.blit(ctrl_title, (ctrl_x, ctrl_y))
-        ctrl_y += 14
-        
-        controls = [
-            "PAUSE - Space",
-            "SKIP - Left/Right",
-            "SPEED - Up/Down",
-            "RESET - R"
-        ]
-        for ctrl in controls:
-            ctrl_text = font_tiny.render(ctrl, True, COLORS['text_white'])
-            canvas.blit(ctrl_text, (ctrl_x, ctrl_y))
-            ctrl_y += 13
+        # === CONTROLS BOX ===
+        canvas.blits(controls_box, doreturn=False)
         
         # Pause indicator
-        if paused:
-            if (pygame.time.get_ticks() // 400) % 2:
-                pause_bg = pygame.Surface((100, 24))
-                pause_bg.fill(COLORS['panel_border'])
-                canvas.blit(pause_bg, (MAP_WIDTH // 2 - 50, 20))
-                pause_text = font_large.render("PAUSE", True, COLORS['text_yellow'])
-                canvas.blit(pause_text, (MAP_WIDTH // 2 - 44, 22))
+        if show_pause:
+            canvas.blit(pause_badge, PAUSE_RECT)
+        profiler.mark('panel')
         
     except Exception as e:
         error_text = font_small.render("LOADING", True, COLORS['text_magenta'])
@@ -513,14 +626,266 @@ while animation_running:
         print(f"Error: {e}")
     
     # Apply CRT effect
-    apply_crt_effect(canvas)
+    canvas.blit(scanlines, (0, 0))
+    profiler.mark('crt')
+
+
+def draw_library(selected):
+    """Race library menu: cached sessions around the selected one, resident ones marked"""
+    canvas.blit(library_bg, LIBRARY_RECT)
+    canvas.blit(library_title, (LIBRARY_RECT.x + 10, LIBRARY_RECT.y + 8))
+    
+    entries = library.entries
+    if not entries:
+        canvas.blit(text_cache.render(font_tiny, "NO CACHED SESSIONS", COLORS['text_dim']),
+                    (LIBRARY_RECT.x + 10, LIBRARY_RECT.y + 34))
+    first = max(0, min(selected - LIBRARY_ROWS // 2, len(entries) - LIBRARY_ROWS))
+    row_y = LIBRARY_RECT.y + 34
+    for i in range(first, min(first + LIBRARY_ROWS, len(entries))):
+        entry = entries[i]
+        color = COLORS['text_yellow'] if i == selected else COLORS['text_white']
+        if i == selected:
+            canvas.blit(text_cache.render(font_tiny, ">", color), (LIBRARY_RECT.x + 10, row_y))
+        canvas.blit(text_cache.render(font_tiny, str(entry['year']), color), (LIBRARY_RECT.x + 22, row_y))
+        canvas.blit(text_cache.render(font_tiny, entry['event_name'][:28], color), (LIBRARY_RECT.x + 62, row_y))
+        canvas.blit(text_cache.render(font_tiny, entry['ses'], color), (LIBRARY_RECT.x + 280, row_y))
+        
+        # NOW = on screen, MEM = resident (instant), otherwise read from the cache
+        if entry['key'] == active_key:
+            status, status_color = "NOW", COLORS['text_cyan']
+        elif entry['key'] in library:
+            status, status_color = "MEM", COLORS['text_magenta']
+        else:
+            status, status_color = f"{len(entry['drivers'])} DRV", COLORS['text_dim']
+        status_text = text_cache.render(font_tiny, status, status_color)
+        canvas.blit(status_text, (LIBRARY_RECT.right - 10 - status_text.get_width(), row_y))
+        row_y += 18
+    
+    canvas.blit(library_help, (LIBRARY_RECT.x + 10, LIBRARY_RECT.bottom - 22))
+    library_stats = text_cache.render(font_tiny, library.stats(), COLORS['text_dim'])
+    canvas.blit(library_stats, (LIBRARY_RECT.right - 10 - library_stats.get_width(), LIBRARY_RECT.bottom - 22))
+    canvas.blit(scanlines, LIBRARY_RECT, LIBRARY_RECT)
+
+
+def switch_race(entry):
+    """Bring a library entry on screen, from memory when resident or else from the cache"""
+    global active_race, active_key
+    active_race['race_time'] = current_race_time
+    library.add(active_key, active_race)
     
-    # Scale up
-    scaled_canvas = pygame.transform.scale(canvas, (WIDTH, HEIGHT))
-    screen.blit(scaled_canvas, (0, 0))
+    race = library.get(entry['key'])
+    if race is None:
+        race_drivers = [driver for driver in drivers if driver in entry['drivers']] or entry['drivers']
+        switch_loading = LoadTimer()
+        switch_loading.stage(f"Loading {entry['year']} {entry['event_name']} {entry['ses']}")
+        race_event_name, race_timelines = run_loading_screen(
+            BackgroundLoad(entry['year'], entry['wknd'], entry['ses'], race_drivers, workers),
+            screen, canvas, clock, (font_large, font_small, font_tiny), COLORS, "RACE ORACLE",
+        )
+        race = prepare_race(race_event_name, race_timelines, switch_loading)
+        if race is None:
+            activate_race(active_race)
+            return
+        library.add(entry['key'], race)
+        print(f">>> Race ready in {switch_loading.total():.2f}s ({library.stats()})")
+    else:
+        print(f">>> Switched to resident {entry['event_name']} {entry['ses']}")
     
-    pygame.display.flip()
-    clock.tick(60)
+    active_race, active_key = race, entry['key']
+    activate_race(race)
+
 
+# Animation state
+animation_running = True
+paused = args.paused
+speed_multiplier = args.speed
+event_filter = None
+current_race_time = 0.0
+last_time = pygame.time.get_ticks()
+
+if headless_export:
+    export_end = max_race_time if export_end is None else min(export_end, max_race_time)
+    speed_multiplier = export_speed
+    num_frames = int((export_end - export_start) * export_fps / export_speed)
+    export_surface = pygame.Surface((WIDTH, HEIGHT))
+    
+    def render_export_frame(frame):
+        """Frame i of the export, drawn exactly as the window would at that race time"""
+        profiler.begin_frame()
+        draw_frame(export_start + frame * export_speed / export_fps)
+        present(canvas, export_surface)
+        profiler.mark('scale')
+        profiler.end_frame()
+        return export_surface
+    
+    if profile_csv and export_workers > 1:
+        # Forked workers time their frames in their own copy of the profiler
+        print("    (--profile-csv only records frames with --export-workers 1)")
+    print(f"\n>>> Exporting {num_frames} frames at {export_fps} fps (x{export_speed:.1f})...")
+    export_frames(render_export_frame, num_frames, (WIDTH, HEIGHT),
+                  out_dir=export_dir, video=export_video, fps=export_fps, workers=export_workers)
+    print(f">>> Export complete: {export_video or export_dir}")
+    profiler.close()
+    pygame.quit()
+    sys.exit()
+
+# Rebuild the tables on the stream thread as laps arrive; the loop swaps them in
+stream_version = 0
+if race_stream is not None:
+    race_stream.builder = lambda timelines: build_race_tables(
+        {driver: timelines[driver] for driver in driver_names if driver in timelines}
+    )
+
+# Library menu state (L)
+library_open = False
+library_selected = 0
+
+print("\n>>> RACE ORACLE READY - Starting simulation!")
+print("=" * 60)
+
+# ============================================================
+# MAIN LOOP
+# ============================================================
+
+while animation_running:
+    profiler.begin_frame()
+    current_time = pygame.time.get_ticks()
+    dt = current_time - last_time
+    last_time = current_time
+    
+    switch_to = None
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            animation_running = False
+        elif event.type == pygame.KEYDOWN and library_open:
+            # The menu takes the keyboard while open
+            if event.key in (pygame.K_ESCAPE, pygame.K_l):
+                library_open = False
+            elif event.key == pygame.K_UP and library.entries:
+                library_selected = (library_selected - 1) % len(library.entries)
+            elif event.key == pygame.K_DOWN and library.entries:
+                library_selected = (library_selected + 1) % len(library.entries)
+            elif event.key == pygame.K_RETURN and library.entries:
+                switch_to = library.entries[library_selected]
+                library_open = False
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_SPACE:
+                paused = not paused
+            elif event.key == pygame.K_RIGHT:
+                current_race_time = min(current_race_time + 10, max_race_time)
+            elif event.key == pygame.K_LEFT:
+                current_race_time = max(current_race_time - 10, 0)
+            elif event.key == pygame.K_UP:
+                speed_multiplier = min(speed_multiplier + 1, 20)
+            elif event.key == pygame.K_DOWN:
+                speed_multiplier = max(speed_multiplier - 1, 0.5)
+            elif event.key == pygame.K_r:
+                current_race_time = 0
+            elif event.key in (pygame.K_n, pygame.K_b):
+                jump = event_jump(current_race_time, forward=event.key == pygame.K_n)
+                if jump is not None:
+                    current_race_time = jump
+            elif event.key == pygame.K_e:
+                event_filter = EVENT_FILTERS[(EVENT_FILTERS.index(event_filter) + 1) % len(EVENT_FILTERS)]
+            elif event.key == pygame.K_F3:
+                show_profiler = not show_profiler
+                profile_overlay = None
+            elif event.key == pygame.K_l:
+                if race_stream is not None:
+                    print(">>> Library available once all laps are processed")
+                else:
+                    library.scan()
+                    keys = [entry['key'] for entry in library.entries]
+                    library_selected = keys.index(active_key) if active_key in keys else 0
+                    library_open = True
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and not library_open:
+            native_pos = (event.pos[0] // SCALE_FACTOR, event.pos[1] // SCALE_FACTOR)
+            if SCRUBBER_RECT.collidepoint(native_pos):
+                current_race_time = scrubber_seek(native_pos[0])
+        elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+            scheduler.invalidate()
+    
+    if switch_to is not None and switch_to['key'] != active_key:
+        switch_race(switch_to)
+        current_race_time = active_race['race_time']
+        dt = 0
+        scheduler.invalidate()
+    
+    # Swap in tables covering laps streamed since the last check
+    if race_stream is not None and race_stream.version != stream_version:
+        stream_version = race_stream.version
+        timelines, built, max_race_time, stream_complete = race_stream.latest()
+        if built is None:
+            built = build_race_tables({driver: timelines[driver] for driver in driver_names if driver in timelines})
+        race_timeline, leaderboard, race_events = built
+        active_race.update(timelines=timelines, max_race_time=max_race_time,
+                           race_timeline=race_timeline, leaderboard=leaderboard, race_events=race_events)
+        if stream_complete:
+            race_stream = None
+            print(f">>> All laps processed ({max_race_time/60:.1f} minutes)")
+            if leaderboard_csv:
+                export_leaderboard()
+    elif race_stream is not None and not race_stream.is_alive():
+        # The stream thread died before finishing; keep playing what it had published
+        print(f"\n>>> ERROR: Streaming stopped at {max_race_time/60:.1f} minutes: {race_stream.error}")
+        race_stream = None
+    
+    if not paused:
+        current_race_time += (dt / 1000.0) * speed_multiplier
+        if current_race_time >= max_race_time:
+            # Hold at the processed horizon while laps are still streaming in
+            current_race_time = 0 if race_stream is None else max_race_time
+    profiler.mark('events')
+    
+    # What the frame shows; an unchanged description means the last frame is still up
+    show_pause = bool(paused and blink_on(pygame.time.get_ticks()))
+    buffering = race_stream is not None and current_race_time >= max_race_time
+    scheduler.track('frame', (current_race_time, speed_multiplier, stream_version, buffering, event_filter))
+    scheduler.track('pause', show_pause, PAUSE_RECT)
+    scheduler.track('profiler', (show_profiler, profiler.frames // 15 if show_profiler else 0))
+    scheduler.track('library', (library_open, library_selected, active_key))
+    dirty = scheduler.take_dirty()
+    if not dirty:
+        if paused or buffering:
+            # Sleep until input, the next blink toggle, or a poll for streamed laps
+            scheduler.idle(until_blink(pygame.time.get_ticks()) if paused else None)
+        else:
+            # Playing, but under a millisecond passed (uncapped FPS); pace instead of sleeping a poll
+            scheduler.tick(clock)
+        continue
+    
+    draw_frame(current_race_time, show_pause)
+    if buffering:
+        canvas.blit(buffering_text, (MAP_WIDTH // 2 - buffering_text.get_width() // 2, 50))
+    if library_open:
+        draw_library(library_selected)
+    
+    # Profiler HUD (top right of the map)
+    if show_profiler:
+        if profile_overlay is None or profiler.frames % 15 == 0:
+            profile_overlay = build_profile_overlay(font_tiny, COLORS, profiler.summary())
+        canvas.blit(profile_overlay, (MAP_WIDTH - profile_overlay.get_width() - 8, 8))
+    profiler.mark('overlay')
+    
+    # Scale up straight into the display surface, only where the frame changed
+    if dirty == [scheduler.full]:
+        present(canvas, screen)
+        profiler.mark('scale')
+        pygame.display.flip()
+    else:
+        updated = present_rects(canvas, screen, dirty)
+        profiler.mark('scale')
+        pygame.display.update(updated)
+    profiler.mark('flip')
+    scheduler.tick(clock)
+    profiler.mark('wait')
+    profiler.end_frame()
+
+print(f">>> Text cache: {text_cache.stats()}")
+print(f">>> Race library: {library.stats()}")
+print(f">>> Frames: {scheduler.stats()}")
+print(f">>> Frame timings over the last {len(profiler.samples['frame'])} frames:")
+print(profiler.report())
+profiler.close()
 pygame.quit()
 sys.exit()
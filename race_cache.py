@@ -0,0 +1,67 @@
+import os
+
+from race_file import COLUMN_DTYPES, RaceFile, write_race_file
+
+# Bump whenever the preprocessing in race_data changes what ends up in a timeline
+CACHE_VERSION = 4
+CACHE_DIR = os.path.join("cache", "processed")
+
+TIMELINE_COLUMNS = tuple(COLUMN_DTYPES)
+
+
+def session_key(year, wknd, ses):
+    """File-name-safe key for a session"""
+    return f"{year}_{str(wknd).replace(' ', '_')}_{ses}"
+
+
+def cache_path(year, wknd, ses):
+    """Path of the race file holding every processed driver of one session"""
+    return os.path.join(CACHE_DIR, f"{session_key(year, wknd, ses)}.race")
+
+
+def open_session(year, wknd, ses):
+    """Open the cached race file for a session, or None if missing or stale"""
+    path = cache_path(year, wknd, ses)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        race = RaceFile(path)
+    except Exception as e:
+        print(f"    WARNING: Ignoring unreadable cache {path}: {e}")
+        return None
+
+    if race.header.get('cache_version') != CACHE_VERSION:
+        return None
+    return race
+
+
+def save_session(year, wknd, ses, event_name, timelines, no_data=()):
+    """Add processed driver timelines to the session's race file
+
+    Drivers already in the file are kept, so the cache fills up across runs
+    with different driver selections. no_data lists drivers that produced no
+    timeline; they are recorded too, so later runs don't load the session
+    again just to find nothing.
+    """
+    path = cache_path(year, wknd, ses)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    merged = {}
+    no_data = set(no_data)
+    existing = open_session(year, wknd, ses)
+    if existing is not None:
+        for driver in existing.drivers:
+            if driver not in timelines:
+                merged[driver] = existing.timeline(driver, copy=True)
+        no_data.update(existing.no_data)
+        # Unmap before the file is replaced below
+        existing.close()
+        del existing
+    merged.update(timelines)
+    no_data.difference_update(merged)
+
+    write_race_file(path, event_name, merged, extra_header={
+        'cache_version': CACHE_VERSION, 'year': year, 'wknd': wknd, 'ses': ses,
+        'no_data': sorted(no_data),
+    })
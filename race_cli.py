@@ -0,0 +1,89 @@
+"""Command line for the simulators and the season precompute
+
+    python race_cli.py replay --year 2024 --event 9 --drivers HAM VER LEC
+    python race_cli.py lap --year 2024 --event 9 --driver LEC --scale 3
+    python race_cli.py precompute 2024 --sessions R Q --workers 8
+
+replay and lap run multi-sim.py and single-sim.py with the remaining
+arguments. Both scripts also take those arguments directly (--help lists
+them); without arguments they use the parameters at their top.
+"""
+import argparse
+import os
+import runpy
+import sys
+
+SCRIPTS = {'replay': 'multi-sim.py', 'lap': 'single-sim.py'}
+
+
+def event_arg(value):
+    """Round number or event name, as fastf1.get_session accepts"""
+    return int(value) if value.isdigit() else value
+
+
+def simulator_parser(prog, description, year, wknd, ses, speed):
+    """Arguments shared by both simulators; defaults come from the script's parameters
+
+    --scale and --fps default to None, leaving the script's SCALE_FACTOR and FPS.
+    """
+    parser = argparse.ArgumentParser(prog=prog, description=description)
+    parser.add_argument('--year', type=int, default=year, help="season (default %(default)s)")
+    parser.add_argument('--event', type=event_arg, default=wknd,
+                        help="round number or event name (default %(default)s)")
+    parser.add_argument('--session', default=ses, help="FP1, FP2, FP3, Q, S, SQ or R (default %(default)s)")
+
+    display = parser.add_argument_group("display and playback")
+    display.add_argument('--scale', type=int, help="window pixels per native pixel")
+    display.add_argument('--fps', type=int, help="frame cap, 0 = uncapped")
+    display.add_argument('--vsync', action='store_true', help="pace playback by the display refresh")
+    display.add_argument('--speed', type=float, default=speed, help="initial playback speed (default %(default)s)")
+    display.add_argument('--paused', action='store_true', help="start paused")
+    display.add_argument('--profile-csv', help="write per-frame stage timings to this CSV")
+    return parser
+
+
+def add_export_args(parser, fps, speed, workers):
+    """Headless export options; setting --export-dir or --export-video renders offline"""
+    export = parser.add_argument_group("headless export (renders offline instead of opening a window)")
+    export.add_argument('--export-dir', help="write a PNG sequence to this directory")
+    export.add_argument('--export-video', help="encode to this video file (needs ffmpeg)")
+    export.add_argument('--export-fps', type=int, default=fps, help="(default %(default)s)")
+    export.add_argument('--export-speed', type=float, default=speed, help="(default %(default)s)")
+    export.add_argument('--export-workers', type=int, default=workers, help="(default %(default)s)")
+    return export
+
+
+def run_script(command, args):
+    """Run a simulator script as __main__ with args as its command line"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), SCRIPTS[command])
+    sys.argv = [script] + list(args)
+    runpy.run_path(script, run_name='__main__')
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in SCRIPTS:
+        # The scripts parse their own arguments
+        run_script(argv[0], argv[1:])
+        return
+
+    parser = argparse.ArgumentParser(prog="race_cli.py", description="RACE ORACLE / TRACKSHIFT")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for command, script in SCRIPTS.items():
+        commands.add_parser(command, help=f"run {script} (see {command} --help)")
+
+    precompute = commands.add_parser('precompute', help="process whole seasons into the local cache")
+    precompute.add_argument('years', type=int, nargs='+', help="season(s) to process")
+    precompute.add_argument('--rounds', type=int, nargs='+', help="only these round numbers")
+    precompute.add_argument('--sessions', nargs='+', help="only these sessions, e.g. R Q (default all)")
+    precompute.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="processes per session (default %(default)s)")
+
+    args = parser.parse_args(argv)
+    from race_precompute import precompute_season
+    for year in args.years:
+        precompute_season(year, args.rounds, args.sessions, args.workers)
+
+
+if __name__ == '__main__':
+    main()
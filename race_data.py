@@ -0,0 +1,530 @@
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import numpy as np
+import pandas as pd
+
+import race_cache
+
+
+class LoadCancelled(Exception):
+    """Raised by load_race when its LoadProgress was cancelled"""
+
+
+class LoadProgress:
+    """Progress of a load_race call, safe to read from another thread
+
+    load_race reports through log() (which also prints) and the lap counters;
+    a loading screen polls snapshot(). cancel() asks the load to stop before
+    the next driver is processed.
+    """
+
+    def __init__(self, history=6):
+        self._lock = threading.Lock()
+        self.status = "Starting"
+        self.lines = deque(maxlen=history)
+        self.laps_done = 0
+        self.laps_total = 0
+        self.cancelled = False
+        self.started = time.perf_counter()
+
+    def set_status(self, status):
+        with self._lock:
+            self.status = status
+
+    def log(self, message):
+        print(message)
+        with self._lock:
+            self.lines.append(message.strip())
+
+    def add_laps(self, count):
+        with self._lock:
+            self.laps_total += count
+
+    def lap_done(self, count=1):
+        with self._lock:
+            self.laps_done += count
+
+    def cancel(self):
+        self.cancelled = True
+
+    def snapshot(self):
+        """Consistent copy of the current progress for drawing"""
+        with self._lock:
+            return {
+                'status': self.status,
+                'lines': list(self.lines),
+                'laps_done': self.laps_done,
+                'laps_total': self.laps_total,
+                'elapsed': time.perf_counter() - self.started,
+            }
+
+
+def get_event_name(session):
+    """Readable event name for a loaded session"""
+    event_info = session.event
+    if hasattr(event_info, 'EventName'):
+        return str(event_info.EventName)
+    elif hasattr(event_info, 'Location'):
+        return str(event_info.Location)
+    return "RACE"
+
+
+class TimelineBuilder:
+    """Append-only driver timeline, extended one lap at a time in lap order"""
+
+    def __init__(self):
+        self.lap_columns = {column: [] for column in race_cache.TIMELINE_COLUMNS}
+        self.total_time = 0
+        self.total_distance = 0
+        self.lap_distances = []
+        self.lap_numbers = []
+        self.lap_times = []
+
+    def add_lap(self, lap):
+        """Append one lap's telemetry; laps without a time or telemetry are skipped"""
+        try:
+            tel = lap.get_car_data().add_distance()
+            pos = lap.get_pos_data()
+
+            lap_time = lap['LapTime']
+            if pd.isna(lap_time):
+                return False
+
+            lap_duration = lap_time.total_seconds()
+            tel_data = pd.merge(tel, pos, left_index=True, right_index=True, how='inner')
+
+            if len(tel_data) == 0:
+                return False
+
+            # Get max distance for this lap
+            lap_length = tel_data['Distance'].max()
+            num_points = len(tel_data)
+            time_per_point = lap_duration / num_points
+
+            # Whole-lap columns instead of one dict per sample
+            columns = {
+                'time': self.total_time + tel_data.index.to_numpy() * time_per_point,
+                'x': tel_data['X'].to_numpy(),
+                'y': tel_data['Y'].to_numpy(),
+                'speed': tel_data['Speed'].to_numpy(),
+                'distance': tel_data['Distance'].to_numpy(),
+                'lap': np.full(num_points, int(lap['LapNumber'])),
+                'race_distance': self.total_distance + tel_data['Distance'].to_numpy(),
+            }
+        except Exception as e:
+            return False
+
+        for column, values in columns.items():
+            self.lap_columns[column].append(values)
+        self.lap_distances.append(lap_length)
+        self.lap_numbers.append(int(lap['LapNumber']))
+        self.lap_times.append(lap_duration)
+        self.total_time += lap_duration
+        self.total_distance += lap_length
+        return True
+
+    def timeline(self, num_laps):
+        """Timeline of the laps added so far, or None if there are none"""
+        if not self.lap_columns['time']:
+            return None
+
+        telemetry_df = pd.DataFrame({
+            column: np.concatenate(chunks) for column, chunks in self.lap_columns.items()
+        })
+        # Guard the distance -> time inverse against small dips in the integrated distance
+        telemetry_df['race_distance'] = np.maximum.accumulate(telemetry_df['race_distance'].to_numpy())
+
+        return {
+            'telemetry': telemetry_df,
+            'total_time': self.total_time,
+            'num_laps': num_laps,
+            'lap_distances': list(self.lap_distances),
+            'lap_numbers': list(self.lap_numbers),
+            'lap_times': list(self.lap_times),
+        }
+
+
+def process_driver(session, driver, on_lap=None):
+    """Build a driver's complete race timeline from session telemetry
+
+    on_lap, if given, is called once per lap as the laps are worked through.
+    """
+    laps = session.laps.pick_drivers(driver)
+    if len(laps) == 0:
+        return None
+
+    builder = TimelineBuilder()
+    for _, lap in laps.iterlaps():
+        if on_lap is not None:
+            on_lap()
+        builder.add_lap(lap)
+    return builder.timeline(len(laps))
+
+
+# Session and shared lap counter for forked pool workers; set just before the pool starts
+_pool_session = None
+_pool_laps_done = None
+
+
+def _count_pool_lap():
+    with _pool_laps_done.get_lock():
+        _pool_laps_done.value += 1
+
+
+def _process_driver_task(driver, on_lap=None):
+    """Pool task: process one driver and report how long it took"""
+    driver_start = time.perf_counter()
+    if on_lap is None and _pool_laps_done is not None:
+        on_lap = _count_pool_lap
+    try:
+        timeline = process_driver(_pool_session, driver, on_lap)
+        return driver, timeline, None, time.perf_counter() - driver_start
+    except Exception as e:
+        return driver, None, str(e), time.perf_counter() - driver_start
+
+
+def process_drivers(session, drivers, workers=1, progress=None):
+    """Process several drivers, fanning out across a process pool when workers > 1
+
+    Yields (driver, timeline, error, seconds) as each driver finishes. Workers
+    are forked so they inherit the loaded session instead of re-loading or
+    pickling it; where fork is unavailable the drivers run sequentially.
+    With a LoadProgress, laps are counted as they are processed and
+    cancelling it stops before the next driver starts.
+    """
+    global _pool_session, _pool_laps_done
+
+    workers = min(workers, len(drivers))
+    if workers > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+        print("    (Process pool needs fork support, processing drivers sequentially)")
+        workers = 1
+
+    _pool_session = session
+    try:
+        if workers <= 1:
+            for driver in drivers:
+                if progress is not None and progress.cancelled:
+                    return
+                yield _process_driver_task(driver, progress.lap_done if progress is not None else None)
+            return
+
+        context = multiprocessing.get_context('fork')
+        _pool_laps_done = context.Value('i', 0)
+        laps_reported = 0
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            pending = {pool.submit(_process_driver_task, driver) for driver in drivers}
+            while pending:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                if progress is not None:
+                    laps = _pool_laps_done.value
+                    progress.lap_done(laps - laps_reported)
+                    laps_reported = laps
+                    if progress.cancelled:
+                        for future in pending:
+                            future.cancel()
+                        return
+                for future in done:
+                    yield future.result()
+    finally:
+        _pool_session = None
+        _pool_laps_done = None
+
+
+def split_laps(timeline):
+    """Split a driver timeline into per-lap x/y/speed arrays with lap metadata"""
+    telemetry = timeline['telemetry']
+    lap_labels = telemetry['lap'].to_numpy()
+    boundaries = np.flatnonzero(np.diff(lap_labels)) + 1
+
+    columns = {column: np.split(telemetry[column].to_numpy(), boundaries)
+               for column in ('x', 'y', 'speed', 'distance')}
+
+    return [
+        {
+            'lap_number': lap_number,
+            'lap_time': lap_time,
+            'x': columns['x'][i],
+            'y': columns['y'][i],
+            'speed': columns['speed'][i],
+            'distance': columns['distance'][i],
+        }
+        for i, (lap_number, lap_time) in enumerate(zip(timeline['lap_numbers'], timeline['lap_times']))
+    ]
+
+
+def _load_cached(year, wknd, ses, drivers, progress):
+    """Cached timelines for the requested drivers, the event name and the drivers still missing"""
+    timelines = {}
+    event_name = None
+
+    progress.set_status("Reading cache")
+    race = race_cache.open_session(year, wknd, ses)
+    known = set() if race is None else set(race.drivers) | set(race.no_data)
+    missing = [driver for driver in drivers if driver not in known]
+    for driver in drivers:
+        if driver in missing:
+            continue
+        event_name = race.event_name
+        if driver in race.no_data:
+            progress.log(f"    Loading {driver}... ✗ No telemetry (cached)")
+            continue
+        # The file gets rewritten once the missing drivers are processed, so don't keep it mapped
+        timelines[driver] = race.timeline(driver, copy=bool(missing))
+        progress.log(f"    Loading {driver}... ✓ ({timelines[driver]['num_laps']} laps, "
+                     f"{timelines[driver]['total_time']:.1f}s) from cache")
+    if race is not None and missing:
+        race.close()
+    return event_name, timelines, missing
+
+
+def event_round(year, wknd):
+    """Round number of an event given by name, so the cache finds it under either
+
+    Precomputed sessions are stored by round number. Names are resolved with
+    FastF1's fuzzy event lookup (the schedule is cached locally after the
+    first run); if that fails the name is kept and the session is cached
+    under it as before.
+    """
+    if not isinstance(wknd, str):
+        return wknd
+
+    import fastf1 as ff1
+
+    try:
+        return int(ff1.get_event(year, wknd)['RoundNumber'])
+    except Exception as e:
+        print(f"    WARNING: Could not look up the round number of {wknd!r}: {e}")
+        return wknd
+
+
+def _load_session(year, wknd, ses, progress):
+    """Download (or read FastF1's own cache of) a session"""
+    import fastf1 as ff1
+
+    progress.set_status("Downloading session")
+    progress.log("    Loading F1 session data...")
+    progress.log("    (This may take several minutes on first run)")
+    load_start = time.perf_counter()
+    session = ff1.get_session(year, wknd, ses)
+    session.load()
+    progress.log(f"    Session loaded in {time.perf_counter() - load_start:.2f}s")
+    if progress.cancelled:
+        raise LoadCancelled()
+    return session
+
+
+def _process_missing(year, wknd, ses, session, missing, workers, progress):
+    """Process drivers missing from the cache and add them to it; returns the event name and their timelines"""
+    event_name = get_event_name(session)
+
+    progress.set_status("Processing telemetry")
+    progress.add_laps(len(session.laps.pick_drivers(missing)))
+    processed = {}
+    no_data = []
+    for driver, timeline, error, seconds in process_drivers(session, missing, workers, progress):
+        if error is not None:
+            progress.log(f"    Loading {driver}... ✗ Failed: {error}")
+        elif timeline is None:
+            no_data.append(driver)
+            progress.log(f"    Loading {driver}... ✗ No telemetry")
+        else:
+            processed[driver] = timeline
+            progress.log(f"    Loading {driver}... ✓ ({timeline['num_laps']} laps, "
+                         f"{timeline['total_time']:.1f}s) in {seconds:.2f}s")
+    if progress.cancelled:
+        raise LoadCancelled()
+
+    if processed or no_data:
+        progress.set_status("Saving cache")
+        race_cache.save_session(year, wknd, ses, event_name, processed, no_data)
+    return event_name, processed
+
+
+def load_race(year, wknd, ses, drivers, workers=1, progress=None):
+    """Load driver timelines from the processed cache, falling back to FastF1
+
+    Returns the event name and a dict of driver -> timeline. The FastF1 session
+    is only loaded when at least one requested driver is missing from the cache,
+    and the missing drivers are then processed on up to `workers` processes.
+    Pass a LoadProgress to follow along from another thread (see BackgroundLoad).
+    """
+    if progress is None:
+        progress = LoadProgress()
+
+    event_name, timelines, missing = _load_cached(year, wknd, ses, drivers, progress)
+
+    if missing:
+        session = _load_session(year, wknd, ses, progress)
+        event_name, processed = _process_missing(year, wknd, ses, session, missing, workers, progress)
+        timelines.update(processed)
+
+    progress.set_status("Ready")
+
+    # Keep the requested driver order regardless of which came from the cache
+    timelines = {driver: timelines[driver] for driver in drivers if driver in timelines}
+    return event_name or "RACE", timelines
+
+
+def precompute_session(year, wknd, ses, workers=1, progress=None):
+    """Process every driver of a session into the cache
+
+    Returns (drivers processed now, drivers already cached, drivers that
+    produced no timeline).
+    """
+    if progress is None:
+        progress = LoadProgress()
+
+    session = _load_session(year, wknd, ses, progress)
+    drivers = [driver for driver in pd.unique(session.laps['Driver']) if isinstance(driver, str)]
+    _, _, missing = _load_cached(year, wknd, ses, drivers, progress)
+    processed = {}
+    if missing:
+        _, processed = _process_missing(year, wknd, ses, session, missing, workers, progress)
+    return len(processed), len(drivers) - len(missing), len(missing) - len(processed)
+
+
+class BackgroundLoad(threading.Thread):
+    """Runs load_race on a daemon thread so the window stays responsive
+
+    Poll progress.snapshot() until ready is set; then either result holds
+    (event_name, timelines) or error holds the exception load_race raised.
+    """
+
+    def __init__(self, year, wknd, ses, drivers, workers=1):
+        super().__init__(daemon=True)
+        self.load_args = (year, wknd, ses, drivers, workers)
+        self.progress = LoadProgress()
+        self.ready = threading.Event()
+        self.result = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.result = load_race(*self.load_args, progress=self.progress)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.ready.set()
+
+
+class RaceStream(threading.Thread):
+    """Processes uncached drivers lap by lap, all drivers in step, on a daemon thread
+
+    Laps are handled in lap order (lap 1 of every driver, then lap 2, ...) into
+    append-only TimelineBuilders, so the race is complete from the start up to
+    a growing horizon: the race time every driver's data has reached. ready is
+    set once start_laps laps of every driver are in (or everything came from
+    the cache); result then holds (event_name, timelines) like BackgroundLoad.
+
+    After each lap round the stream publishes fresh timelines. If `builder` is
+    set, it is called with them on the stream thread so expensive tables can be
+    rebuilt off the render thread; latest() returns its output. Drivers load
+    on one thread here, since the stream itself keeps playback going. The
+    finished timelines are saved to the processed cache.
+    """
+
+    def __init__(self, year, wknd, ses, drivers, start_laps=3):
+        super().__init__(daemon=True)
+        self.load_args = (year, wknd, ses, drivers)
+        self.start_laps = start_laps
+        self.progress = LoadProgress()
+        self.ready = threading.Event()
+        self.result = None
+        self.error = None
+        self.builder = None
+
+        self.version = 0
+        self._lock = threading.Lock()
+        self._latest = (None, None, 0.0, False)
+
+    def latest(self):
+        """(timelines, built, horizon, complete) as of the last published lap round"""
+        with self._lock:
+            return self._latest
+
+    def _publish(self, event_name, drivers, timelines, horizon, complete):
+        timelines = {driver: timelines[driver] for driver in drivers if driver in timelines}
+        built = self.builder(timelines) if self.builder is not None and timelines else None
+        with self._lock:
+            self._latest = (timelines, built, horizon, complete)
+            self.version += 1
+        if not self.ready.is_set() and (timelines or complete):
+            self.result = (event_name or "RACE", timelines)
+            self.ready.set()
+
+    def run(self):
+        try:
+            self._stream()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.ready.set()
+
+    def _stream(self):
+        year, wknd, ses, drivers = self.load_args
+        progress = self.progress
+
+        event_name, cached, missing = _load_cached(year, wknd, ses, drivers, progress)
+        if not missing:
+            progress.set_status("Ready")
+            self._publish(event_name, drivers, cached,
+                          max([t['total_time'] for t in cached.values()], default=0.0), True)
+            return
+
+        session = _load_session(year, wknd, ses, progress)
+        event_name = get_event_name(session)
+
+        driver_laps = {driver: [lap for _, lap in session.laps.pick_drivers(driver).iterlaps()] for driver in missing}
+        builders = {driver: TimelineBuilder() for driver in missing}
+        progress.set_status("Processing telemetry")
+        progress.add_laps(sum(len(laps) for laps in driver_laps.values()))
+
+        num_rounds = max([len(laps) for laps in driver_laps.values()], default=0)
+        timelines = dict(cached)
+        if num_rounds == 0:
+            # None of the missing drivers ran in this session; play what the cache has
+            self._publish(event_name, drivers, timelines,
+                          max([t['total_time'] for t in timelines.values()], default=0.0), True)
+        for lap_index in range(num_rounds):
+            for driver in missing:
+                if lap_index < len(driver_laps[driver]):
+                    if progress.cancelled:
+                        raise LoadCancelled()
+                    builders[driver].add_lap(driver_laps[driver][lap_index])
+                    progress.lap_done()
+
+            # Every driver's data is complete up to the slowest unfinished driver
+            complete = lap_index == num_rounds - 1
+            timelines = dict(cached)
+            horizons = []
+            for driver in missing:
+                timeline = builders[driver].timeline(len(driver_laps[driver]))
+                if timeline is not None:
+                    timelines[driver] = timeline
+                    if lap_index < len(driver_laps[driver]) - 1:
+                        horizons.append(builders[driver].total_time)
+            total = max([t['total_time'] for t in timelines.values()], default=0.0)
+            horizon = total if complete else min(horizons, default=total)
+
+            if lap_index + 1 >= self.start_laps or complete:
+                self._publish(event_name, drivers, timelines, horizon, complete)
+
+        processed = {driver: timelines[driver] for driver in missing if driver in timelines}
+        no_data = [driver for driver in missing if driver not in processed]
+        for driver in missing:
+            if driver in processed:
+                progress.log(f"    Loading {driver}... ✓ ({processed[driver]['num_laps']} laps, "
+                             f"{processed[driver]['total_time']:.1f}s) streamed")
+            else:
+                progress.log(f"    Loading {driver}... ✗ No telemetry")
+        if processed or no_data:
+            progress.set_status("Saving cache")
+            try:
+                race_cache.save_session(year, wknd, ses, event_name, processed, no_data)
+            except OSError as e:
+                # Playback already has the complete race; only the next run pays for this
+                print(f"    WARNING: Could not save the processed cache: {e}")
+        progress.set_status("Ready")
@@ -0,0 +1,150 @@
+"""Memory-mapped columnar race file
+
+Layout of a .race file:
+
+    magic       8 bytes   b"RORACE\\x00\\x01"
+    header_len  8 bytes   little-endian uint64
+    header      JSON      event metadata and per-driver column offsets
+    padding               up to the next BLOCK_ALIGN boundary
+    data                  one fixed-dtype column block per driver and column
+
+Column offsets in the header are relative to the start of the data section,
+and every block starts on a BLOCK_ALIGN boundary so the arrays can be viewed
+straight out of a numpy.memmap without copying.
+"""
+import json
+import os
+import struct
+import numpy as np
+import pandas as pd
+
+MAGIC = b"RORACE\x00\x01"
+BLOCK_ALIGN = 64
+
+# Fixed on-disk dtype of every timeline column
+COLUMN_DTYPES = {
+    'time': np.dtype('<f8'),
+    'x': np.dtype('<f4'),
+    'y': np.dtype('<f4'),
+    'speed': np.dtype('<f4'),
+    'distance': np.dtype('<f4'),
+    'lap': np.dtype('<i4'),
+    'race_distance': np.dtype('<f8'),
+}
+
+# Small per-driver values kept in the JSON header
+DRIVER_META = ('total_time', 'num_laps', 'lap_distances', 'lap_numbers', 'lap_times')
+
+
+def _align(offset):
+    return (offset + BLOCK_ALIGN - 1) // BLOCK_ALIGN * BLOCK_ALIGN
+
+
+def write_race_file(path, event_name, timelines, extra_header=None):
+    """Write driver timelines for one session as a single columnar race file"""
+    header = {
+        'event_name': event_name,
+        'avg_lap_distance': float(np.mean([
+            dist for timeline in timelines.values() for dist in timeline['lap_distances']
+        ])) if timelines else 0.0,
+        'max_race_time': float(max(
+            [timeline['total_time'] for timeline in timelines.values()], default=0.0
+        )),
+        'drivers': {},
+    }
+    header.update(extra_header or {})
+
+    blocks = []
+    offset = 0
+    for driver, timeline in timelines.items():
+        telemetry = timeline['telemetry']
+        entry = {
+            'rows': len(telemetry),
+            'total_time': float(timeline['total_time']),
+            'num_laps': int(timeline['num_laps']),
+            'lap_distances': [float(d) for d in timeline['lap_distances']],
+            'lap_numbers': [int(n) for n in timeline['lap_numbers']],
+            'lap_times': [float(t) for t in timeline['lap_times']],
+            'offsets': {},
+        }
+
+        for column, dtype in COLUMN_DTYPES.items():
+            data = np.ascontiguousarray(telemetry[column].to_numpy(), dtype=dtype)
+            offset = _align(offset)
+            entry['offsets'][column] = offset
+            blocks.append((offset, data))
+            offset += data.nbytes
+
+        header['drivers'][driver] = entry
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = _align(len(MAGIC) + 8 + len(header_bytes))
+
+    # Write next to the target and swap in, so readers never see a torn file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for block_offset, data in blocks:
+            f.seek(data_start + block_offset)
+            f.write(data.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+def read_race_header(path):
+    """Read only the JSON header of a race file"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a race file")
+        (header_len,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_len).decode('utf-8'))
+    header['data_start'] = _align(len(MAGIC) + 8 + header_len)
+    return header
+
+
+class RaceFile:
+    """Read-only view of a race file; column data is paged in on first touch"""
+
+    def __init__(self, path):
+        self.path = path
+        self.header = read_race_header(path)
+        self.event_name = self.header['event_name']
+        self.avg_lap_distance = self.header['avg_lap_distance']
+        self.max_race_time = self.header['max_race_time']
+        self.drivers = list(self.header['drivers'])
+        # Drivers the session was checked for that had no usable telemetry
+        self.no_data = list(self.header.get('no_data', []))
+        self._data = None
+
+    def _map(self):
+        if self._data is None:
+            self._data = np.memmap(self.path, dtype=np.uint8, mode='r')
+        return self._data
+
+    def columns(self, driver):
+        """Zero-copy column arrays for one driver"""
+        entry = self.header['drivers'][driver]
+        data = self._map()
+        start = self.header['data_start']
+        return {
+            column: np.frombuffer(data, dtype=dtype, count=entry['rows'],
+                                  offset=start + entry['offsets'][column])
+            for column, dtype in COLUMN_DTYPES.items()
+        }
+
+    def timeline(self, driver, copy=False):
+        """Driver timeline in the same shape race_data.process_driver returns
+
+        The telemetry views the mapped file unless copy is set. Copy when the
+        file is about to be rewritten: Windows can't replace a file while any
+        view keeps it mapped.
+        """
+        entry = self.header['drivers'][driver]
+        timeline = {key: entry[key] for key in DRIVER_META}
+        timeline['telemetry'] = pd.DataFrame(self.columns(driver), copy=copy)
+        return timeline
+
+    def close(self):
+        self._data = None
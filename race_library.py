@@ -0,0 +1,141 @@
+"""Index of locally cached sessions and the set of races kept resident for instant switching"""
+import glob
+import mmap
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from race_cache import CACHE_DIR, CACHE_VERSION
+from race_file import read_race_header
+
+
+def parse_session_key(key):
+    """(year, wknd, ses) back from a session_key, for files that predate them being in the header"""
+    year, *wknd, ses = key.split('_')
+    wknd = '_'.join(wknd)
+    return int(year), int(wknd) if wknd.isdigit() else wknd.replace('_', ' '), ses
+
+
+def scan_sessions(cache_dir=CACHE_DIR):
+    """Every up-to-date cached session, latest year first, reading only the file headers"""
+    entries = []
+    for path in glob.glob(os.path.join(cache_dir, "*.race")):
+        key = os.path.splitext(os.path.basename(path))[0]
+        try:
+            header = read_race_header(path)
+            if 'year' in header:
+                year, wknd, ses = header['year'], header['wknd'], header['ses']
+            else:
+                year, wknd, ses = parse_session_key(key)
+        except Exception as e:
+            print(f"    WARNING: Skipping unreadable cache {path}: {e}")
+            continue
+        if header.get('cache_version') != CACHE_VERSION or not header['drivers']:
+            continue
+
+        entries.append({
+            'key': key,
+            'year': year,
+            'wknd': wknd,
+            'ses': ses,
+            'event_name': header['event_name'],
+            'drivers': list(header['drivers']),
+            'max_race_time': header['max_race_time'],
+        })
+
+    entries.sort(key=lambda entry: (-entry['year'], entry['event_name'], entry['ses']))
+    return entries
+
+
+def file_backed(array):
+    """True if array views a memory-mapped file, whose pages the OS can drop and re-read"""
+    while array is not None:
+        if isinstance(array, (np.memmap, mmap.mmap)):
+            return True
+        array = getattr(array, 'base', None)
+    return False
+
+
+def resident_nbytes(value, _seen=None):
+    """Approximate memory held by a prepared race
+
+    Counts numpy arrays, DataFrames and pygame surfaces, following dicts,
+    lists and object attributes; anything reachable twice is counted once.
+    Arrays and DataFrame columns that view a mapped .race file are not
+    counted: they live in the page cache, not in the race.
+    """
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, np.ndarray):
+        return 0 if file_backed(value) else value.nbytes
+    if isinstance(value, pd.DataFrame):
+        columns = (value[column].to_numpy() for column in value.columns)
+        return int(value.index.nbytes) + sum(0 if file_backed(values) else values.nbytes for values in columns)
+    if hasattr(value, 'get_bytesize') and hasattr(value, 'get_size'):
+        width, height = value.get_size()
+        return width * height * value.get_bytesize()
+    if isinstance(value, dict):
+        return sum(resident_nbytes(item, seen) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(resident_nbytes(item, seen) for item in value)
+    if hasattr(value, '__dict__') and not callable(value):
+        return resident_nbytes(vars(value), seen)
+    return 0
+
+
+class RaceLibrary:
+    """Cached sessions on disk plus the prepared races kept in memory
+
+    entries is the on-disk index from scan(). Prepared races go in with
+    add() and come back from get() without reloading; the least recently
+    used are dropped once they take more than max_bytes, but never the one
+    added last.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = []
+        self.nbytes = 0
+        self.evictions = 0
+        self._resident = OrderedDict()
+        self._sizes = {}
+
+    def scan(self):
+        """Re-read the cache directory (sessions may have been added since the last scan)"""
+        self.entries = scan_sessions()
+        return self.entries
+
+    def get(self, key):
+        """Resident race for key, or None if it has to be loaded"""
+        race = self._resident.get(key)
+        if race is not None:
+            self._resident.move_to_end(key)
+        return race
+
+    def add(self, key, race):
+        """Keep race resident (re-measuring it if already there) and evict down to the budget"""
+        if key in self._resident:
+            self.nbytes -= self._sizes[key]
+        size = resident_nbytes(race)
+        self._resident[key] = race
+        self._resident.move_to_end(key)
+        self._sizes[key] = size
+        self.nbytes += size
+
+        while self.nbytes > self.max_bytes and len(self._resident) > 1:
+            evicted, _ = self._resident.popitem(last=False)
+            self.nbytes -= self._sizes.pop(evicted)
+            self.evictions += 1
+
+    def __contains__(self, key):
+        return key in self._resident
+
+    def stats(self):
+        """Resident races, their size against max_bytes and evictions so far"""
+        return (f"{len(self._resident)} resident, {self.nbytes / (1024 * 1024):.0f}/{self.max_bytes / (1024 * 1024):.0f} MB, "
+                f"{self.evictions} evicted")
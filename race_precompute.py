@@ -0,0 +1,133 @@
+"""Batch processing of whole seasons into the processed-data cache
+
+Every session of a season that has already run is loaded from FastF1 and
+all of its drivers are processed into the cache, so interactive runs never
+start cold. Drivers within a session are processed on a process pool
+(race_data.process_drivers). Progress is recorded per session in a state
+file next to the cache; a rerun skips finished sessions and retries failed
+ones, so an interrupted overnight run just picks up where it stopped.
+Sessions finished under an older CACHE_VERSION, or whose file has been
+deleted, are processed again.
+"""
+import json
+import os
+import time
+
+import pandas as pd
+
+import race_cache
+from race_data import LoadProgress, precompute_session
+
+# FastF1 schedule session names -> the identifiers the simulators pass as ses
+SESSION_IDENTIFIERS = {
+    'Practice 1': 'FP1',
+    'Practice 2': 'FP2',
+    'Practice 3': 'FP3',
+    'Qualifying': 'Q',
+    'Sprint': 'S',
+    'Sprint Qualifying': 'SQ',
+    'Sprint Shootout': 'SS',
+    'Race': 'R',
+}
+
+
+def state_path(year):
+    return os.path.join(race_cache.CACHE_DIR, f"precompute_{year}.json")
+
+
+def load_state(year):
+    """Per-session outcome of earlier runs, keyed by race_cache.session_key"""
+    try:
+        with open(state_path(year)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_state(year, state):
+    path = state_path(year)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def season_sessions(year, rounds=None, sessions=None):
+    """(round, event name, session identifier) for each session of the season that has started
+
+    rounds and sessions optionally restrict to some round numbers or session
+    identifiers ('R', 'Q', ...). Testing events are left out.
+    """
+    import fastf1 as ff1
+
+    schedule = ff1.get_event_schedule(year, include_testing=False)
+    now = pd.Timestamp.now(tz='UTC')
+    for _, event in schedule.iterrows():
+        round_number = int(event['RoundNumber'])
+        if round_number == 0 or (rounds and round_number not in rounds):
+            continue
+
+        for i in range(1, 6):
+            name = event.get(f'Session{i}')
+            if not isinstance(name, str) or not name:
+                continue
+            ses = SESSION_IDENTIFIERS.get(name, name)
+            if sessions and ses not in sessions:
+                continue
+
+            start = event.get(f'Session{i}DateUtc')
+            if start is not None and not pd.isna(start):
+                start = pd.Timestamp(start)
+                if (start.tz_localize('UTC') if start.tzinfo is None else start) > now:
+                    continue
+            yield round_number, event['EventName'], ses
+
+
+def is_done(state, year, round_number, ses):
+    """Whether an earlier run finished this session for the current cache version and its file is still there"""
+    entry = state.get(race_cache.session_key(year, round_number, ses), {})
+    return (entry.get('status') == 'done' and entry.get('cache_version') == race_cache.CACHE_VERSION
+            and os.path.exists(race_cache.cache_path(year, round_number, ses)))
+
+
+def precompute_season(year, rounds=None, sessions=None, workers=1):
+    """Process every driver of every finished session of a season into the cache"""
+    state = load_state(year)
+    todo = list(season_sessions(year, rounds, sessions))
+
+    print("=" * 60)
+    print(f"RACE ORACLE PRECOMPUTE - {year} season, {len(todo)} sessions, {workers} workers")
+    print("=" * 60)
+
+    season_start = time.perf_counter()
+    counts = {'done': 0, 'skipped': 0, 'failed': 0}
+    for n, (round_number, event_name, ses) in enumerate(todo, start=1):
+        key = race_cache.session_key(year, round_number, ses)
+        if is_done(state, year, round_number, ses):
+            counts['skipped'] += 1
+            continue
+
+        print(f"\n>>> [{n}/{len(todo)}] Round {round_number} {event_name} - {ses}")
+        start = time.perf_counter()
+        try:
+            processed, cached, empty = precompute_session(year, round_number, ses, workers, LoadProgress())
+        except KeyboardInterrupt:
+            print(f"\n>>> Interrupted; progress saved to {state_path(year)}")
+            raise
+        except Exception as e:
+            print(f"    ✗ Failed: {e}")
+            state[key] = {'status': 'failed', 'error': str(e)}
+            counts['failed'] += 1
+        else:
+            seconds = time.perf_counter() - start
+            print(f"    ✓ {processed} processed, {cached} already cached, {empty} without telemetry "
+                  f"in {seconds:.1f}s")
+            state[key] = {'status': 'done', 'cache_version': race_cache.CACHE_VERSION,
+                          'drivers': processed + cached, 'seconds': round(seconds, 1)}
+            counts['done'] += 1
+        save_state(year, state)
+
+    print(f"\n>>> {year}: {counts['done']} sessions processed, {counts['skipped']} already done, "
+          f"{counts['failed']} failed in {(time.perf_counter() - season_start) / 60:.1f} minutes")
+    return counts
@@ -0,0 +1,374 @@
+import numpy as np
+import pandas as pd
+
+
+class RaceTimeline:
+    """Every driver's timeline packed end-to-end for vectorized all-driver queries
+
+    Each driver's sample times are shifted by driver_index * span so the packed
+    key array stays sorted, which lets one searchsorted call find the nearest
+    sample of every driver at once. The cumulative race distance is packed the
+    same way to answer "when did this driver reach distance d" for intervals.
+    Screen positions are computed once up front.
+    """
+
+    def __init__(self, drivers, columns_by_driver, to_screen, max_gap=5.0):
+        self.drivers = list(drivers)
+        self.max_gap = max_gap
+        self.to_screen = to_screen
+
+        lengths = np.array([len(columns_by_driver[d]['time']) for d in self.drivers])
+        self.starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        self.ends = self.starts + lengths - 1
+
+        self.columns = {
+            column: np.concatenate([np.asarray(columns_by_driver[d][column]) for d in self.drivers])
+            for column in ('time', 'x', 'y', 'speed', 'distance', 'lap', 'race_distance')
+        }
+        self.columns['total_distance'] = self.columns.pop('race_distance')
+        self.columns['screen_x'], self.columns['screen_y'] = to_screen(
+            self.columns['x'], self.columns['y']
+        )
+
+        # Gap between driver blocks is larger than any lookup cutoff
+        self.span = float(self.columns['time'].max()) + 2 * max_gap + 1.0
+        self.offsets = np.arange(len(self.drivers)) * self.span
+        self.keys = self.columns['time'] + np.repeat(self.offsets, lengths)
+
+        # Distance -> time inverse index; race distance is monotonic per driver
+        distance_span = float(self.columns['total_distance'].max()) + 1.0
+        self.distance_offsets = np.arange(len(self.drivers)) * distance_span
+        self.distance_keys = self.columns['total_distance'] + np.repeat(self.distance_offsets, lengths)
+
+    def nearest_indices(self, t):
+        """Packed index of each driver's sample nearest to t
+
+        t may be a scalar (result shape [drivers]) or an array of times
+        (result shape [drivers, len(t)]). Ties go to the earlier sample.
+        """
+        t = np.asarray(t, dtype=np.float64)
+        shape = (-1,) + (1,) * t.ndim
+        starts = self.starts.reshape(shape)
+        ends = self.ends.reshape(shape)
+
+        times = self.columns['time']
+        hi = np.searchsorted(self.keys, t + self.offsets.reshape(shape), side='left')
+        hi = np.clip(hi, starts, ends)
+        lo = np.maximum(hi - 1, starts)
+        return np.where(np.abs(times[lo] - t) <= np.abs(times[hi] - t), lo, hi)
+
+    def time_at_distance(self, driver_indices, distances):
+        """Race time at which each given driver first reached the given race distance"""
+        starts = self.starts[driver_indices]
+        ends = self.ends[driver_indices]
+        hi = np.searchsorted(self.distance_keys, distances + self.distance_offsets[driver_indices], side='left')
+        hi = np.clip(hi, starts, ends)
+        lo = np.maximum(hi - 1, starts)
+
+        d0 = self.columns['total_distance'][lo]
+        d1 = self.columns['total_distance'][hi]
+        t0 = self.columns['time'][lo]
+        t1 = self.columns['time'][hi]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frac = np.clip(np.where(d1 > d0, (distances - d0) / (d1 - d0), 0.0), 0.0, 1.0)
+        return t0 + frac * (t1 - t0)
+
+    def intervals(self, order, distances, t):
+        """Time interval in seconds from each car in order to the car ahead (0 for the leader)
+
+        The interval is how long ago the car ahead passed the point on track
+        where the car behind is now, the way timing screens show it.
+        """
+        order = np.asarray(order)
+        reached = self.time_at_distance(order[:-1], distances[order[1:]])
+        return np.concatenate(([0.0], np.maximum(t - reached, 0.0)))
+
+    def state_at(self, t):
+        """State of every driver at race time t as a dict of aligned arrays
+
+        'valid' is False for drivers with no sample within max_gap seconds of t.
+        """
+        idx = self.nearest_indices(t)
+        state = {column: values[idx] for column, values in self.columns.items()}
+        state['valid'] = np.abs(state['time'] - t) <= self.max_gap
+        return state
+
+
+class UniformRaceGrid:
+    """All drivers resampled onto one shared uniform clock
+
+    Values are stored as dense [drivers x ticks] arrays, so a lookup is two
+    column reads and a linear blend regardless of how many samples each driver
+    had. Exposes the same state_at() as RaceTimeline.
+    """
+
+    # Interpolated between ticks; the rest are taken from the nearest tick
+    BLENDED = ('x', 'y', 'speed', 'total_distance')
+    STEPPED = ('distance', 'lap')
+
+    def __init__(self, timeline, hz=25):
+        self.drivers = timeline.drivers
+        self.hz = float(hz)
+        self.to_screen = timeline.to_screen
+        self.source = timeline
+
+        times = timeline.columns['time']
+        # Run past the last sample far enough for the no-data cutoff to kick in
+        num_ticks = int(np.ceil((times.max() + timeline.max_gap) * self.hz)) + 2
+        ticks = np.arange(num_ticks) / self.hz
+
+        shape = (len(self.drivers), num_ticks)
+        self.grid = {column: np.empty(shape, dtype=np.float32) for column in self.BLENDED}
+        self.grid['distance'] = np.empty(shape, dtype=np.float32)
+        self.grid['lap'] = np.empty(shape, dtype=np.int32)
+        self.valid = np.empty(shape, dtype=bool)
+
+        for d, (start, end) in enumerate(zip(timeline.starts, timeline.ends)):
+            driver_times = times[start:end + 1]
+            for column in self.BLENDED:
+                self.grid[column][d] = np.interp(ticks, driver_times,
+                                                 timeline.columns[column][start:end + 1])
+
+            # Nearest original sample for stepped values and the no-data cutoff
+            hi = np.clip(np.searchsorted(driver_times, ticks), 0, len(driver_times) - 1)
+            lo = np.maximum(hi - 1, 0)
+            nearest = np.where(np.abs(driver_times[lo] - ticks) <= np.abs(driver_times[hi] - ticks), lo, hi)
+            for column in self.STEPPED:
+                self.grid[column][d] = timeline.columns[column][start:end + 1][nearest]
+            self.valid[d] = np.abs(driver_times[nearest] - ticks) <= timeline.max_gap
+
+    def state_at(self, t):
+        """State of every driver at race time t, blended between the two nearest ticks"""
+        last = self.valid.shape[1] - 1
+        f = min(max(t * self.hz, 0.0), float(last))
+        i = min(int(f), last - 1)
+        w = f - i
+        nearest = i + 1 if w > 0.5 else i
+
+        state = {column: self.grid[column][:, i] * (1.0 - w) + self.grid[column][:, i + 1] * w
+                 for column in self.BLENDED}
+        for column in self.STEPPED:
+            state[column] = self.grid[column][:, nearest]
+        state['time'] = np.full(len(self.drivers), t)
+        state['valid'] = self.valid[:, nearest] & (t * self.hz <= last)
+        state['screen_x'], state['screen_y'] = self.to_screen(state['x'], state['y'])
+        return state
+
+    def intervals(self, order, distances, t):
+        """Time interval to the car ahead, answered by the source timeline's inverse index"""
+        return self.source.intervals(order, distances, t)
+
+
+class LeaderboardTable:
+    """Running order and gaps for the whole race, precomputed on a fixed tick
+
+    The order only changes a few times per lap, so it is stored run-length
+    encoded: change_ticks[k] is the first tick at which change_orders[k]
+    applies. Orders list driver indices by position, padded with -1 for
+    drivers without data at that moment. Gaps (in meters) are dense
+    [ticks x positions] float32 arrays.
+    """
+
+    def __init__(self, timeline, hz=10):
+        self.drivers = timeline.drivers
+        self.hz = float(hz)
+
+        num_ticks = int(np.ceil(timeline.columns['time'].max() * self.hz)) + 1
+        self.times = np.arange(num_ticks) / self.hz
+
+        idx = timeline.nearest_indices(self.times)
+        valid = np.abs(timeline.columns['time'][idx] - self.times) <= timeline.max_gap
+        totals = np.where(valid, timeline.columns['total_distance'][idx], -np.inf)
+
+        # Leader first; drivers without data sink to the end, ties keep driver order
+        orders = np.argsort(-totals, axis=0, kind='stable').T
+        sorted_totals = np.take_along_axis(totals.T, orders, axis=1)
+        num_valid = valid.sum(axis=0)
+        ranked = np.arange(len(self.drivers)) < num_valid[:, None]
+        orders = np.where(ranked, orders, -1).astype(np.int16)
+
+        with np.errstate(invalid='ignore'):
+            gap_ahead = np.full(orders.shape, np.nan, dtype=np.float32)
+            gap_ahead[:, 1:] = sorted_totals[:, :-1] - sorted_totals[:, 1:]
+            gap_leader = (sorted_totals[:, :1] - sorted_totals).astype(np.float32)
+        self.gap_ahead = np.where(ranked, gap_ahead, np.nan)
+        self.gap_leader = np.where(ranked, gap_leader, np.nan)
+
+        changed = np.ones(num_ticks, dtype=bool)
+        changed[1:] = np.any(orders[1:] != orders[:-1], axis=1)
+        self.change_ticks = np.flatnonzero(changed)
+        self.change_orders = orders[changed]
+
+    def tick_at(self, t):
+        """Table tick nearest to race time t"""
+        return min(max(int(round(t * self.hz)), 0), len(self.times) - 1)
+
+    def at(self, t):
+        """Running order (driver indices), gap to the car ahead and gap to the leader at t"""
+        tick = self.tick_at(t)
+        k = int(np.searchsorted(self.change_ticks, tick, side='right')) - 1
+        order = self.change_orders[k]
+        count = int(np.count_nonzero(order >= 0))
+        return order[:count], self.gap_ahead[tick, :count], self.gap_leader[tick, :count]
+
+    def to_dataframe(self):
+        """Long-format table (time, position, driver, gaps) for analysis"""
+        orders = np.repeat(self.change_orders, np.diff(np.append(self.change_ticks, len(self.times))), axis=0)
+        tick, position = np.nonzero(orders >= 0)
+        return pd.DataFrame({
+            'time': self.times[tick],
+            'position': position + 1,
+            'driver': np.asarray(self.drivers)[orders[tick, position]],
+            'gap_ahead_m': self.gap_ahead[tick, position],
+            'gap_leader_m': self.gap_leader[tick, position],
+        })
+
+
+EVENT_KINDS = ('overtake', 'pit', 'leader_lap', 'lap')
+
+
+class RaceEventIndex:
+    """Notable moments of the race, found in one vectorized pass and sorted by time
+
+    Events are overtakes from the leaderboard (a driver getting ahead of a
+    car that was ahead of them and is still running, held for at least
+    overtake_hold seconds so near-ties flickering back and forth don't
+    count), probable pit stops (the car below pit_speed km/h for at least
+    pit_min_duration seconds), every driver's lap completions including the
+    finish, and the leader's lap boundaries. Each event is a time, a kind
+    (index into EVENT_KINDS), a driver index and a value: the position
+    gained, the stop length in seconds or the lap number.
+    next_after/previous_before are binary searches over the whole index or
+    over one kind.
+    """
+
+    def __init__(self, timeline, leaderboard, pit_speed=90.0, pit_min_duration=10.0, overtake_hold=2.0):
+        self.drivers = timeline.drivers
+        columns = timeline.columns
+        lengths = timeline.ends - timeline.starts + 1
+        driver_of = np.repeat(np.arange(len(self.drivers)), lengths)
+        block_start = np.zeros(len(driver_of), dtype=bool)
+        block_start[timeline.starts] = True
+        block_end = np.zeros(len(driver_of), dtype=bool)
+        block_end[timeline.ends] = True
+
+        # Lap completions: the lap number changes within a driver's block
+        lap = columns['lap']
+        new_lap = np.zeros(len(lap), dtype=bool)
+        new_lap[1:] = lap[1:] != lap[:-1]
+        new_lap &= ~block_start
+        lap_starts = np.flatnonzero(new_lap)
+        lap_times, lap_drivers = columns['time'][lap_starts], driver_of[lap_starts]
+        lap_values, started = lap[lap_starts - 1], lap[lap_starts]
+
+        # Leader's lap boundaries: whoever starts lap n first is leading at that moment
+        by_lap = np.lexsort((lap_times, started))
+        first = by_lap[np.r_[True, np.diff(started[by_lap]) != 0]] if len(by_lap) else by_lap
+        leader_times, leader_drivers, leader_values = lap_times[first], lap_drivers[first], started[first]
+
+        # Each driver's last lap ends with their data rather than with a new number
+        lap_times = np.concatenate((lap_times, columns['time'][timeline.ends]))
+        lap_drivers = np.concatenate((lap_drivers, np.arange(len(self.drivers))))
+        lap_values = np.concatenate((lap_values, lap[timeline.ends]))
+
+        # Pit stops: runs of slow samples, split at driver block boundaries
+        slow = columns['speed'] < pit_speed
+        run_start = slow & (block_start | ~np.r_[False, slow[:-1]])
+        run_end = slow & (block_end | ~np.r_[slow[1:], False])
+        starts, ends = np.flatnonzero(run_start), np.flatnonzero(run_end)
+        durations = columns['time'][ends] - columns['time'][starts]
+        stops = starts[durations >= pit_min_duration]
+        pit_times, pit_drivers = columns['time'][stops], driver_of[stops]
+        pit_values = np.round(durations[durations >= pit_min_duration])
+
+        # Overtakes between consecutive leaderboard orders: passed[k, d, o] when driver d
+        # was behind o and is now ahead of o, with both still running. Moving up because
+        # the car ahead retired or finished (its data ended, or it stays ranked on its
+        # last sample for up to max_gap seconds) is not a pass
+        orders = leaderboard.change_orders
+        positions = np.full((len(orders), len(self.drivers)), -1, dtype=np.int16)
+        rows, ranks = np.nonzero(orders >= 0)
+        positions[rows, orders[rows, ranks]] = ranks
+        change_times = leaderboard.times[leaderboard.change_ticks[1:]]
+        running = change_times[:, None] <= columns['time'][timeline.ends]
+        before = positions[:-1]
+        after = np.where(running, positions[1:], -1)
+        other_before, other_after = before[:, None, :], after[:, None, :]
+        passed = ((after[:, :, None] >= 0) & (other_before >= 0)
+                  & (other_before < before[:, :, None]) & (other_after > after[:, :, None]))
+        gain_k, gain_driver = np.nonzero(passed.any(axis=2))
+        loss_k, loss_driver = np.nonzero(passed.any(axis=1))
+
+        # Drop gains given back within overtake_hold: pack (driver, time) keys like RaceTimeline
+        span = float(leaderboard.times[-1]) + overtake_hold + 1.0
+        loss_keys = np.sort(change_times[loss_k] + loss_driver * span)
+        gain_keys = change_times[gain_k] + gain_driver * span
+        next_loss = np.searchsorted(loss_keys, gain_keys, side='right')
+        held = np.ones(len(gain_keys), dtype=bool)
+        has_loss = next_loss < len(loss_keys)
+        held[has_loss] = loss_keys[next_loss[has_loss]] - gain_keys[has_loss] >= overtake_hold
+        gain_k, gain_driver = gain_k[held], gain_driver[held]
+        pass_times, pass_values = change_times[gain_k], positions[gain_k + 1, gain_driver] + 1
+
+        times = np.concatenate((pass_times, pit_times, leader_times, lap_times)).astype(np.float64)
+        kinds = np.repeat(np.arange(len(EVENT_KINDS), dtype=np.int8),
+                          [len(pass_times), len(pit_times), len(leader_times), len(lap_times)])
+        drivers = np.concatenate((gain_driver, pit_drivers, leader_drivers, lap_drivers))
+        values = np.concatenate((pass_values, pit_values, leader_values, lap_values))
+
+        order = np.lexsort((kinds, times))
+        self.times = times[order]
+        self.kinds = kinds[order]
+        self.driver_indices = drivers[order].astype(np.int16)
+        self.values = values[order].astype(np.int32)
+        self._kind_rows = {kind: np.flatnonzero(self.kinds == k) for k, kind in enumerate(EVENT_KINDS)}
+        self._kind_times = {kind: self.times[rows] for kind, rows in self._kind_rows.items()}
+
+    def __len__(self):
+        return len(self.times)
+
+    def counts(self):
+        """Number of events of each kind"""
+        return {kind: len(rows) for kind, rows in self._kind_rows.items()}
+
+    def _search(self, kind):
+        if kind is None:
+            return self.times, None
+        return self._kind_times[kind], self._kind_rows[kind]
+
+    def next_after(self, t, kind=None):
+        """Row of the first event strictly after t (optionally of one kind), or None"""
+        times, rows = self._search(kind)
+        i = int(np.searchsorted(times, t, side='right'))
+        if i == len(times):
+            return None
+        return i if rows is None else int(rows[i])
+
+    def previous_before(self, t, kind=None):
+        """Row of the last event strictly before t (optionally of one kind), or None"""
+        times, rows = self._search(kind)
+        i = int(np.searchsorted(times, t, side='left')) - 1
+        if i < 0:
+            return None
+        return i if rows is None else int(rows[i])
+
+    def label(self, row):
+        """Short description of an event for the panel, e.g. 'PASS HAM P4'"""
+        kind, value = EVENT_KINDS[self.kinds[row]], self.values[row]
+        driver = self.drivers[self.driver_indices[row]]
+        if kind == 'overtake':
+            return f"PASS {driver} P{value}"
+        if kind == 'pit':
+            return f"PIT {driver} {value}s"
+        if kind == 'leader_lap':
+            return f"LEADER LAP {value}"
+        return f"{driver} END LAP {value}"
+
+    def to_dataframe(self):
+        """One row per event (time, kind, driver, value) for analysis"""
+        return pd.DataFrame({
+            'time': self.times,
+            'kind': np.asarray(EVENT_KINDS)[self.kinds],
+            'driver': np.asarray(self.drivers)[self.driver_indices],
+            'value': self.values,
+        })
@@ -0,0 +1,229 @@
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+
+def build_scanlines(size, color):
+    """CRT scanline overlay, rendered once and blitted over every frame"""
+    width, height = size
+    scanline_surface = pygame.Surface(size, pygame.SRCALPHA)
+    for y in range(0, height, 2):
+        pygame.draw.line(scanline_surface, color, (0, y), (width, y), 1)
+    return scanline_surface
+
+
+def simplify_polyline(x, y, tolerance=1.0):
+    """Douglas-Peucker reduction of a screen-space polyline to a list of (x, y) points
+
+    Drops every point that lies within tolerance pixels of the simplified
+    line, which keeps the drawn shape while cutting thousands of samples to
+    a few hundred.
+    """
+    points = np.column_stack((x, y)).astype(np.float64)
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        origin = points[start]
+        direction = points[end] - origin
+        offsets = points[start + 1:end] - origin
+        length = np.hypot(*direction)
+        if length == 0:
+            # Closed loop: measure from the shared start/end point
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(direction[0] * offsets[:, 1] - direction[1] * offsets[:, 0]) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return [(int(px), int(py)) for px, py in points[keep]]
+
+
+def build_controls_box(pos, width, height, font, colors, controls):
+    """CONTROLS box pre-rendered as a blit sequence for Surface.blits
+
+    The backdrop (with its border baked in) and each text line stay separate
+    surfaces so the text blends onto the frame exactly as if drawn directly.
+    """
+    box_x, box_y = pos
+    box_bg = pygame.Surface((width, height), pygame.SRCALPHA)
+    box_bg.fill((*colors['control_box_bg'], 200))
+    pygame.draw.rect(box_bg, colors['control_box_border'], (0, 0, width, height), 2)
+    blit_sequence = [(box_bg, (box_x, box_y))]
+
+    ctrl_y = box_y + 8
+    ctrl_x = box_x + 6
+
+    ctrl_title = font.render("CONTROLS", True, colors['text_cyan'])
+    blit_sequence.append((ctrl_title, (ctrl_x, ctrl_y)))
+    ctrl_y += 14
+
+    for ctrl in controls:
+        ctrl_text = font.render(ctrl, True, colors['text_white'])
+        blit_sequence.append((ctrl_text, (ctrl_x, ctrl_y)))
+        ctrl_y += 13
+
+    return blit_sequence
+
+
+def build_pause_badge(font, colors):
+    """Blinking PAUSE badge"""
+    pause_bg = pygame.Surface((100, 24))
+    pause_bg.fill(colors['panel_border'])
+    pause_text = font.render("PAUSE", True, colors['text_yellow'])
+    pause_bg.blit(pause_text, (6, 2))
+    return pause_bg
+
+
+def build_car_sprite(font, name, color, outline_color, radius=7, label_rise=18):
+    """Car marker with its name tag, pre-rendered for one blit per car per frame
+
+    Returns (sprite, offset): the sprite's top-left corner sits at the car's
+    position plus offset. The sprite holds premultiplied alpha; blitting it
+    with BLEND_PREMULTIPLIED gives the same result as drawing the marker, the
+    translucent tag backing and the name one after another.
+    """
+    label = font.render(name, True, color)
+    tag_x, tag_y = -(label.get_width() // 2) - 2, -label_rise
+    tag_w, tag_h = label.get_width() + 4, label.get_height()
+    left, top = min(-radius, tag_x), min(-radius, tag_y)
+    right, bottom = max(radius + 1, tag_x + tag_w), max(radius + 1, tag_y + tag_h)
+
+    sprite = pygame.Surface((right - left, bottom - top), pygame.SRCALPHA)
+    center = (-left, -top)
+    pygame.draw.circle(sprite, color, center, radius)
+    pygame.draw.circle(sprite, outline_color, center, radius, 2)
+
+    tag_bg = pygame.Surface((tag_w, tag_h), pygame.SRCALPHA)
+    tag_bg.fill((0, 0, 0, 180))
+    sprite.blit(tag_bg, (tag_x - left, tag_y - top), special_flags=pygame.BLEND_PREMULTIPLIED)
+    # Copy first: premul_alpha ignores the padded row pitch of rendered text
+    sprite.blit(label.copy().premul_alpha(), (tag_x + 2 - left, tag_y - top),
+                special_flags=pygame.BLEND_PREMULTIPLIED)
+    return sprite, (left, top)
+
+
+def build_profile_overlay(font, colors, rows):
+    """Frame profiler HUD: one line per stage with p50/p95/max in ms"""
+    lines = [("STAGE", "P50", "P95", "MAX")]
+    lines += [(stage.upper(), f"{p50:.2f}", f"{p95:.2f}", f"{worst:.2f}") for stage, p50, p95, worst in rows]
+    line_height = font.get_linesize()
+    name_width = max(font.size(line[0])[0] for line in lines) + 8
+    column_width = max(font.size(value)[0] for line in lines for value in line[1:]) + 8
+    width = 12 + name_width + 3 * column_width
+    height = len(lines) * line_height + 10
+
+    overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+    overlay.fill((*colors['bg_dark'], 210))
+    pygame.draw.rect(overlay, colors['text_cyan'], (0, 0, width, height), 1)
+    for i, line in enumerate(lines):
+        color = colors['text_cyan'] if i == 0 else colors['text_white']
+        y = 5 + i * line_height
+        overlay.blit(font.render(line[0], True, color), (6, y))
+        # Numbers right-aligned in fixed columns so they line up in any font
+        for column, value in enumerate(line[1:], start=1):
+            text = font.render(value, True, color)
+            overlay.blit(text, (6 + name_width + column * column_width - text.get_width(), y))
+    return overlay
+
+
+class TextCache:
+    """Bounded LRU cache of rendered text keyed on font, string and color
+
+    render() covers labels that rarely change. blit_number() draws
+    fast-changing numbers (speed, time, gaps) glyph by glyph from a separate
+    glyph atlas, so a new value never needs re-rasterizing and digits never
+    push labels out. The atlas holds one surface per font, character and
+    color; callers keep the colors to a small palette (single-sim's speed
+    readout uses its gradient lookup table).
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.glyph_hits = 0
+        self.glyph_misses = 0
+        self._entries = OrderedDict()
+        self._glyphs = {}
+        self._advances = {}
+
+    def render(self, font, text, color):
+        """Rendered text surface, rasterized only on a cache miss"""
+        key = (font, text, color)
+        surface = self._entries.get(key)
+        if surface is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, True, color)
+        self._entries[key] = surface
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return surface
+
+    def blit_number(self, target, font, text, color, pos):
+        """Draw a numeric string onto target from cached per-glyph surfaces"""
+        x, y = pos
+        for char in text:
+            key = (font, char, color)
+            glyph = self._glyphs.get(key)
+            if glyph is None:
+                self.glyph_misses += 1
+                glyph = self._glyphs[key] = font.render(char, True, color)
+            else:
+                self.glyph_hits += 1
+            target.blit(glyph, (x, y))
+            advance = self._advances.get((font, char))
+            if advance is None:
+                advance = font.metrics(char)[0][4]
+                self._advances[(font, char)] = advance
+            x += advance
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        glyph_lookups = self.glyph_hits + self.glyph_misses
+        glyph_rate = self.glyph_hits / glyph_lookups if glyph_lookups else 0.0
+        return (f"labels {self.hit_rate * 100:.1f}% hit rate, {len(self._entries)}/{self.max_entries} entries, "
+                f"{self.misses} renders; glyphs {glyph_rate * 100:.1f}% hit rate, {len(self._glyphs)} in atlas")
+
+
+def present(canvas, screen):
+    """Scale the native-resolution canvas straight into the display surface"""
+    pygame.transform.scale(canvas, screen.get_size(), screen)
+
+
+def present_rects(canvas, screen, rects):
+    """Scale only the given canvas rects into the display surface
+
+    Returns the matching display rects for pygame.display.update().
+    """
+    scale = screen.get_width() // canvas.get_width()
+    canvas_rect = canvas.get_rect()
+    updated = []
+    for rect in rects:
+        rect = rect.clip(canvas_rect)
+        if not rect.w or not rect.h:
+            continue
+        target = pygame.Rect(rect.x * scale, rect.y * scale, rect.w * scale, rect.h * scale)
+        if rect == canvas_rect:
+            present(canvas, screen)
+        else:
+            pygame.transform.scale(canvas.subsurface(rect), target.size, screen.subsurface(target))
+        updated.append(target)
+    return updated
@@ -1,26 +1,85 @@
 import pygame
 import numpy as np
 import pandas as pd
-import fastf1 as ff1
 import sys
 import os
 
-# Initialize pygame
-pygame.init()
+from frame_profiler import FrameProfiler, LoadTimer
+from frame_scheduler import FrameScheduler, blink_on, set_display_mode, until_blink
+from lap_cache import LapCache
+from loading_screen import run_loading_screen
+from race_data import BackgroundLoad, event_round, load_race, split_laps
+from retro_render import (TextCache, build_controls_box, build_pause_badge, build_profile_overlay,
+                          build_scanlines, present, present_rects, simplify_polyline)
 
 # Parameters
 year = 2025
 wknd = "MANOS"
 ses = "R"
 driver = "HAM"
+profile_csv = None  # e.g. "frames.csv" to dump per-frame stage timings (F3 toggles the overlay)
+lap_cache_mb = 64  # Memory budget for prepared laps; least recently viewed laps are dropped beyond it
+prefetch_laps = True  # Prepare the previous/next lap in spare frame time so Left/Right never stalls
+trail_length = 60  # Trail segments behind the car; None draws the whole lap so far
+outline_tolerance = 0.75  # Pixels the simplified track outline may stray from the reference lap
+
+# Ghost mode (G): the current lap, the fastest lap and a reference lap raced against
+# each other on one track, with the current lap's delta to the reference
+ghost_mode = False
+ghost_reference = None  # Lap number the delta is measured against (None = fastest; F picks the current lap)
+ghost_laps = []  # Further lap numbers to always include, up to MAX_GHOSTS laps in total
+ghost_grid_step = 5.0  # Metres between points of the shared distance grid
+
+# Headless export: set export_dir (PNG sequence) or export_video (needs ffmpeg)
+# to render every lap offline instead of opening a window
+export_dir = None
+export_video = None
+export_fps = 30
+export_speed = 2.0  # Same scale as the ANIM multiplier
+export_workers = os.cpu_count() or 1
+
+# Command line overrides (python single-sim.py --help); without arguments the parameters above apply
+from race_cli import add_export_args, simulator_parser
+parser = simulator_parser("single-sim.py", "TRACKSHIFT - single driver lap viewer", year, wknd, ses, speed=2.0)
+parser.add_argument('--driver', default=driver, help="driver code (default %(default)s)")
+parser.add_argument('--ghost', action='store_true', help="start in ghost mode")
+parser.add_argument('--ghost-reference', type=int, default=ghost_reference,
+                    help="lap number the delta is measured against (default: fastest)")
+parser.add_argument('--ghost-laps', type=int, nargs='+', default=ghost_laps, help="further lap numbers to race")
+add_export_args(parser, export_fps, export_speed, export_workers)
+args = parser.parse_args()
+year, wknd, ses, driver = args.year, args.event, args.session, args.driver
+wknd = event_round(year, wknd)
+profile_csv = args.profile_csv or profile_csv
+ghost_mode = ghost_mode or args.ghost
+ghost_reference, ghost_laps = args.ghost_reference, args.ghost_laps
+export_dir = args.export_dir or export_dir
+export_video = args.export_video or export_video
+export_fps, export_speed, export_workers = args.export_fps, args.export_speed, args.export_workers
+
+headless_export = export_dir is not None or export_video is not None
+if headless_export:
+    from headless import export_frames, use_dummy_display
+    use_dummy_display()
+
+# Initialize pygame
+pygame.init()
 
 # Screen settings - Optimized for 1920x1080
 NATIVE_WIDTH, NATIVE_HEIGHT = 640, 400
 SCALE_FACTOR = 2
 WIDTH = NATIVE_WIDTH * SCALE_FACTOR
 HEIGHT = NATIVE_HEIGHT * SCALE_FACTOR
+FPS = 60  # The frame loop is light enough to run at 144 on high-refresh displays; 0 = uncapped
+VSYNC = False  # Pace playback by the display refresh (pair with FPS = 0)
+if args.scale:
+    SCALE_FACTOR = args.scale
+    WIDTH, HEIGHT = NATIVE_WIDTH * SCALE_FACTOR, NATIVE_HEIGHT * SCALE_FACTOR
+if args.fps is not None:
+    FPS = args.fps
+VSYNC = VSYNC or args.vsync
 
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
+screen = set_display_mode((WIDTH, HEIGHT), VSYNC)
 canvas = pygame.Surface((NATIVE_WIDTH, NATIVE_HEIGHT))
 pygame.display.set_caption(f"TRACKSHIFT - {driver}")
 clock = pygame.time.Clock()
@@ -46,6 +105,9 @@ COLORS = {
         (255, 100, 150)
     ],
     'scanline': (0, 0, 0, 80),
+    'ghost': (170, 170, 200),
+    'delta_ahead': (0, 255, 150),
+    'delta_behind': (255, 100, 150),
 }
 
 # Layout
@@ -53,102 +115,411 @@ MAP_WIDTH = 480
 PANEL_WIDTH = NATIVE_WIDTH - MAP_WIDTH
 PANEL_X = MAP_WIDTH
 
-# Load F1 data
-print(">>> INITIALIZING TRACKSHIFT...")
-session = ff1.get_session(year, wknd, ses)
-session.load()
-
-# Get event name properly
-event_info = session.event
-if hasattr(event_info, 'EventName'):
-    event_name = str(event_info.EventName)
-elif hasattr(event_info, 'Location'):
-    event_name = str(event_info.Location)
-else:
-    event_name = "RACE"
-
-laps = session.laps.pick_drivers(driver)
-print(f">>> {len(laps)} LAPS LOADED")
-
 # Retro fonts
 font_large = pygame.font.SysFont('courier', 24, bold=True)
 font_med = pygame.font.SysFont('courier', 20, bold=True)
 font_small = pygame.font.SysFont('courier', 16, bold=True)
 font_tiny = pygame.font.SysFont('courier', 12, bold=True)  # For controls
 
-# Normalize coordinates
-def normalize_coords(x_data, y_data, margin=30):
-    x_min, x_max = np.min(x_data), np.max(x_data)
-    y_min, y_max = np.min(y_data), np.max(y_data)
+# Load F1 data (processed timeline comes from the local cache when available),
+# keeping the window responsive on a progress screen meanwhile
+loading = LoadTimer()
+loading.stage("INITIALIZING TRACKSHIFT")
+if headless_export:
+    event_name, timelines = load_race(year, wknd, ses, [driver])
+else:
+    event_name, timelines = run_loading_screen(
+        BackgroundLoad(year, wknd, ses, [driver]), screen, canvas, clock,
+        (font_large, font_small, font_tiny), COLORS, "TRACKSHIFT",
+    )
+if driver not in timelines:
+    print(f">>> NO DATA FOR {driver}")
+    sys.exit(1)
+
+timeline = timelines[driver]
+laps = split_laps(timeline)
+print(f">>> {len(laps)} LAPS LOADED")
+
+# Rendered text and number glyphs, reused across frames
+text_cache = TextCache()
+
+# Global normalization parameters, shared by the outline, the car and every ghost
+track_x_min = None
+track_x_max = None
+track_y_min = None
+track_y_max = None
+track_scale = None
+track_x_offset = None
+track_y_offset = None
+
+def normalize_coords(x, y):
+    """Normalize coordinate arrays using global track parameters"""
+    x_scaled = ((x - track_x_min) * track_scale + track_x_offset).astype(int)
+    y_scaled = ((y - track_y_min) * track_scale + track_y_offset).astype(int)
     
-    x_range = x_max - x_min
-    y_range = y_max - y_min
-    scale = min((MAP_WIDTH - 2*margin) / x_range, (NATIVE_HEIGHT - 2*margin) / y_range)
+    return x_scaled, y_scaled
+
+def setup_normalization(all_x, all_y, margin=30):
+    """Setup global normalization parameters from track data"""
+    global track_x_min, track_x_max, track_y_min, track_y_max
+    global track_scale, track_x_offset, track_y_offset
     
-    x_scaled = (x_data - x_min) * scale
-    y_scaled = (y_data - y_min) * scale
+    track_x_min = np.min(all_x)
+    track_x_max = np.max(all_x)
+    track_y_min = np.min(all_y)
+    track_y_max = np.max(all_y)
     
-    x_offset = (MAP_WIDTH - (x_scaled.max() - x_scaled.min())) / 2
-    y_offset = (NATIVE_HEIGHT - (y_scaled.max() - y_scaled.min())) / 2
+    x_range = track_x_max - track_x_min
+    y_range = track_y_max - track_y_min
     
-    x_scaled = (x_scaled + x_offset).astype(int)
-    y_scaled = (y_scaled + y_offset).astype(int)
+    track_scale = min((MAP_WIDTH - 2*margin) / x_range, (NATIVE_HEIGHT - 2*margin) / y_range)
     
-    return x_scaled, y_scaled
+    x_scaled_range = x_range * track_scale
+    y_scaled_range = y_range * track_scale
+    
+    track_x_offset = (MAP_WIDTH - x_scaled_range) / 2
+    track_y_offset = (NATIVE_HEIGHT - y_scaled_range) / 2
 
-# Speed to color
-def speed_to_color(speed, min_speed, max_speed):
-    if max_speed <= min_speed:
-        return COLORS['speed_gradient'][0]
+# Speed gradient blended once into a lookup table; laps index it, which keeps
+# the palette (and the speed readout's glyph atlas) to SPEED_LEVELS colors
+SPEED_GRADIENT = np.array(COLORS['speed_gradient'], dtype=np.float64)
+SPEED_LEVELS = 64
+
+def gradient_colors(normalized):
+    """(N, 3) uint8 colors along SPEED_GRADIENT for positions in [0, 1]"""
+    num_colors = len(SPEED_GRADIENT)
+    idx = normalized * (num_colors - 1)
+    idx1 = idx.astype(int)
+    idx2 = np.minimum(idx1 + 1, num_colors - 1)
+    blend = (idx - idx1)[:, None]
     
-    normalized = (speed - min_speed) / (max_speed - min_speed)
-    normalized = max(0, min(1, normalized))
+    c1 = SPEED_GRADIENT[idx1]
+    c2 = SPEED_GRADIENT[idx2]
     
-    num_colors = len(COLORS['speed_gradient'])
-    idx = normalized * (num_colors - 1)
-    idx1 = int(idx)
-    idx2 = min(idx1 + 1, num_colors - 1)
-    blend = idx - idx1
+    return (c1 + (c2 - c1) * blend).astype(np.uint8)
+
+SPEED_LUT = gradient_colors(np.linspace(0.0, 1.0, SPEED_LEVELS))
+
+def speed_colors(speed, min_speed, max_speed):
+    """(N, 3) uint8 gradient color for every speed sample of a lap, from SPEED_LUT"""
+    if max_speed <= min_speed:
+        return np.tile(SPEED_LUT[0], (len(speed), 1))
     
-    c1 = COLORS['speed_gradient'][idx1]
-    c2 = COLORS['speed_gradient'][idx2]
+    normalized = np.clip((speed - min_speed) / (max_speed - min_speed), 0, 1)
+    return SPEED_LUT[np.rint(normalized * (SPEED_LEVELS - 1)).astype(int)]
+
+# One transform for the whole session, so ghosts of different laps line up
+# with each other and with the outline
+loading.stage("PROCESSING TRACK DATA")
+setup_normalization(timeline['telemetry']['x'].to_numpy(), timeline['telemetry']['y'].to_numpy())
+
+# Track outline from one representative lap: the median lap time skips the
+# standing start, in/out laps and safety car laps
+lap_times = np.array([lap['lap_time'] for lap in laps], dtype=np.float64)
+timed_laps = np.flatnonzero(np.isfinite(lap_times) & (np.array([len(lap['x']) for lap in laps]) > 1))
+if len(timed_laps):
+    outline_lap = laps[timed_laps[np.argsort(lap_times[timed_laps])[len(timed_laps) // 2]]]
+else:
+    outline_lap = max(laps, key=lambda lap: len(lap['x']))
+
+track_x, track_y = normalize_coords(outline_lap['x'], outline_lap['y'])
+track_points = simplify_polyline(track_x, track_y, outline_tolerance)
+print(f">>> TRACK OUTLINE: LAP {outline_lap['lap_number']}, {len(track_points)}/{len(track_x)} POINTS")
+
+# Per-lap screen points and speed colors, prepared once per lap instead of every frame.
+# Plain lists of tuples, which pygame.draw takes without converting per call
+def prepare_lap(lap):
+    x_scaled, y_scaled = normalize_coords(lap['x'], lap['y'])
+    speed = lap['speed']
+    colors = speed_colors(speed, speed.min(), speed.max())
+    
+    # Position and lap time at every grid distance (samples are evenly spaced in time)
+    distance = np.maximum.accumulate(lap['distance'])
+    sample_time = np.arange(len(distance)) * (lap['lap_time'] / len(distance))
+    return {
+        'points': list(zip(x_scaled.tolist(), y_scaled.tolist())),
+        'colors': list(map(tuple, colors.tolist())),
+        'speed': speed,
+        'grid_x': np.interp(DISTANCE_GRID, distance, x_scaled).astype(np.float32),
+        'grid_y': np.interp(DISTANCE_GRID, distance, y_scaled).astype(np.float32),
+        'grid_time': np.interp(DISTANCE_GRID, distance, sample_time),
+        'lap_number': lap['lap_number'],
+        'lap_seconds': lap['lap_time'],
+        'lap_time': str(pd.Timedelta(seconds=lap['lap_time'])).split('.')[0][-8:],
+    }
+
+lap_cache = LapCache(laps, prepare_lap, max_bytes=lap_cache_mb * 1024 * 1024)
+
+# Ghost laps and their reference. Every lap is resampled onto one shared distance
+# grid when prepared, so each ghost is placed with a couple of interpolations
+MAX_GHOSTS = 5
+lap_index = {lap['lap_number']: i for i, lap in enumerate(laps)}
+fastest_lap_idx = int(timed_laps[np.argmin(lap_times[timed_laps])]) if len(timed_laps) else 0
+reference_lap_idx = lap_index.get(ghost_reference, fastest_lap_idx)
+DISTANCE_GRID = np.arange(0.0, max(lap['distance'][-1] for lap in laps if len(lap['distance'])) + ghost_grid_step,
+                          ghost_grid_step)
+
+def ghost_lap_indices(current_idx):
+    """Laps shown in ghost mode: current, fastest, reference, then ghost_laps"""
+    indices = [current_idx, fastest_lap_idx, reference_lap_idx]
+    indices += [lap_index[number] for number in ghost_laps if number in lap_index]
+    return list(dict.fromkeys(indices))[:MAX_GHOSTS]
+
+def ghost_clock(elapsed_time, indices):
+    """Lap time in seconds shared by all ghosts; the slowest of them takes 10 s of animation at x1.0"""
+    duration = max(laps[i]['lap_time'] for i in indices)
+    return (elapsed_time / 10000.0 * duration) % duration
+
+# ============================================================
+# STATIC LAYERS (rendered once, blitted every frame)
+# ============================================================
+
+loading.stage("PRE-RENDERING STATIC LAYERS")
+
+# Background, track outline and the right panel chrome
+static_layer = pygame.Surface((NATIVE_WIDTH, NATIVE_HEIGHT))
+static_layer.fill(COLORS['bg_dark'])
+if len(track_points) > 1:
+    pygame.draw.lines(static_layer, COLORS['track'], True, track_points, 4)
+
+pygame.draw.rect(static_layer, COLORS['panel_bg'], (PANEL_X, 0, PANEL_WIDTH, NATIVE_HEIGHT))
+pygame.draw.line(static_layer, COLORS['panel_border'], (PANEL_X, 0), (PANEL_X, NATIVE_HEIGHT), 3)
+
+y_pos = 16
+
+# Driver name
+title = font_large.render(driver, True, COLORS['text_yellow'])
+static_layer.blit(title, (PANEL_X + 10, y_pos))
+y_pos += 28
+
+# Event name
+event_display = event_name.split(' ')[0][:8] if ' ' in event_name else event_name[:8]
+event_text = font_small.render(event_display.upper(), True, COLORS['text_cyan'])
+static_layer.blit(event_text, (PANEL_X + 10, y_pos))
+y_pos += 24
+
+# Divider
+pygame.draw.line(static_layer, COLORS['panel_border'], 
+                (PANEL_X + 6, y_pos), (PANEL_X + PANEL_WIDTH - 6, y_pos), 2)
+y_pos += 12
+
+# Lap number
+lap_label = font_small.render("LAP", True, COLORS['text_dim'])
+static_layer.blit(lap_label, (PANEL_X + 10, y_pos))
+y_pos += 18
+LAP_VALUE_POS = (PANEL_X + 10, y_pos)
+y_pos += 28
+
+# Lap time
+time_label = font_small.render("TIME", True, COLORS['text_dim'])
+static_layer.blit(time_label, (PANEL_X + 10, y_pos))
+y_pos += 18
+TIME_VALUE_POS = (PANEL_X + 10, y_pos)
+y_pos += 24
+
+# Speed
+speed_label = font_small.render("SPEED", True, COLORS['text_dim'])
+static_layer.blit(speed_label, (PANEL_X + 10, y_pos))
+y_pos += 18
+SPEED_VALUE_POS = (PANEL_X + 10, y_pos)
+speed_unit = font_small.render("KM/H", True, COLORS['text_dim'])
+static_layer.blit(speed_unit, (PANEL_X + 10, y_pos + 24))
+y_pos += 52
+
+# Progress bar track
+BAR_X, BAR_Y, BAR_W, BAR_H = PANEL_X + 10, y_pos, PANEL_WIDTH - 24, 10
+pygame.draw.rect(static_layer, COLORS['track'], (BAR_X, BAR_Y, BAR_W, BAR_H))
+y_pos += 16
+PROGRESS_VALUE_POS = (PANEL_X + 10, y_pos)
+y_pos += 24
+
+# Animation speed
+multi_label = font_small.render("ANIM", True, COLORS['text_dim'])
+static_layer.blit(multi_label, (PANEL_X + 10, y_pos))
+y_pos += 18
+ANIM_VALUE_POS = (PANEL_X + 10, y_pos)
+y_pos += 28
+
+# Ghost delta, labelled per reference lap in ghost mode only
+DELTA_LABEL_POS = (PANEL_X + 10, y_pos)
+y_pos += 18
+DELTA_VALUE_POS = (PANEL_X + 10, y_pos)
+
+# Panel strip re-blitted after the trail so it never shows through
+PANEL_AREA = pygame.Rect(PANEL_X - 1, 0, NATIVE_WIDTH - PANEL_X + 1, NATIVE_HEIGHT)
+
+# Controls box (bottom left), pause badge and CRT scanlines
+controls_box = build_controls_box((10, NATIVE_HEIGHT - 106 - 10), 130, 106, font_tiny, COLORS, [
+    "PAUSE - Space",
+    "LAP - Right/Left",
+    "SPEED - Up/Down",
+    "RESET - R",
+    "GHOSTS - G",
+    "SET REF - F"
+])
+pause_badge = build_pause_badge(font_large, COLORS)
+PAUSE_RECT = pause_badge.get_rect(topleft=(MAP_WIDTH // 2 - 50, 20))
+scanlines = build_scanlines((NATIVE_WIDTH, NATIVE_HEIGHT), COLORS['scanline'])
+
+loading.done()
+print(f">>> LOADED IN {loading.total():.2f}s")
+
+# Frame stage timings; F3 toggles the HUD, refreshed a few times a second
+profiler = FrameProfiler(
+    ['events', 'trail', 'car', 'panel', 'crt', 'overlay', 'scale', 'flip', 'prefetch', 'wait'],
+    csv_path=profile_csv,
+)
+show_profiler = False
+profile_overlay = None
+
+# Only draw when something on screen changes; a paused lap sleeps between blinks
+scheduler = FrameScheduler((NATIVE_WIDTH, NATIVE_HEIGHT), FPS)
+
+# Frame rendering (shared by the window and headless export)
+def draw_frame(lap_idx, elapsed_time, show_pause=False):
+    """Draw lap lap_idx, elapsed_time ms of animation in, onto the native canvas"""
+    # Background, track outline and panel chrome
+    canvas.blit(static_layer, (0, 0))
     
-    return tuple(int(c1[i] + (c2[i] - c1[i]) * blend) for i in range(3))
-
-# CRT scanlines
-def apply_crt_effect(surface):
-    scanline_surface = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
-    for y in range(0, surface.get_height(), 2):
-        pygame.draw.line(scanline_surface, COLORS['scanline'], 
-                        (0, y), (surface.get_width(), y), 1)
-    surface.blit(scanline_surface, (0, 0))
-
-# Collect track data
-print(">>> PROCESSING TRACK DATA...")
-all_x = []
-all_y = []
-for _, lap in laps.iterlaps():
     try:
-        pos = lap.get_pos_data()
-        all_x.extend(pos['X'].values)
-        all_y.extend(pos['Y'].values)
-    except:
-        continue
+        lap = lap_cache.get(lap_idx)
+        points = lap['points']
+        colors = lap['colors']
+        speed = lap['speed']
+        num_points = len(points)
+        
+        if ghost_mode:
+            # All ghosts run on one lap clock; a finished lap waits at the line
+            ghosts = ghost_lap_indices(lap_idx)
+            lap_clock = ghost_clock(elapsed_time, ghosts)
+            frame_index = min(int(lap_clock / lap['lap_seconds'] * num_points), num_points - 1)
+        else:
+            points_per_second = num_points / 10
+            frame_index = int((elapsed_time / 1000.0) * points_per_second) % num_points
+        
+        # Draw trail, segment i running from point i-1 to point i in that sample's color
+        trail_start = 1 if trail_length is None else max(1, frame_index - trail_length)
+        draw_line = pygame.draw.line
+        for i in range(trail_start, frame_index):
+            draw_line(canvas, colors[i], points[i-1], points[i], 4)
+        profiler.mark('trail')
+        
+        # Draw car
+        car_color = colors[frame_index]
+        pygame.draw.circle(canvas, car_color, points[frame_index], 6)
+        pygame.draw.circle(canvas, COLORS['text_yellow'], points[frame_index], 6, 2)
+        
+        # Ghost cars, placed by distance covered at the shared lap clock
+        if ghost_mode:
+            for ghost_idx in ghosts:
+                if ghost_idx == lap_idx:
+                    continue
+                ghost = lap_cache.get(ghost_idx)
+                distance = np.interp(lap_clock, ghost['grid_time'], DISTANCE_GRID)
+                gx = int(np.interp(distance, DISTANCE_GRID, ghost['grid_x']))
+                gy = int(np.interp(distance, DISTANCE_GRID, ghost['grid_y']))
+                if ghost_idx == fastest_lap_idx:
+                    ghost_color = COLORS['text_magenta']
+                elif ghost_idx == reference_lap_idx:
+                    ghost_color = COLORS['text_cyan']
+                else:
+                    ghost_color = COLORS['ghost']
+                pygame.draw.circle(canvas, ghost_color, (gx, gy), 5, 2)
+                ghost_label = text_cache.render(font_tiny, f"L{ghost['lap_number']}", ghost_color)
+                canvas.blit(ghost_label, (gx - ghost_label.get_width() // 2, gy - 17))
+        profiler.mark('car')
+        
+        # === RIGHT PANEL ===
+        canvas.blit(static_layer, PANEL_AREA, PANEL_AREA)
+        
+        lap_num = lap['lap_number']
+        lap_time = lap['lap_time']
+        
+        current_speed = speed[frame_index]
+        progress_pct = int(frame_index * 100 / num_points)
+        
+        # Lap number
+        lap_value = text_cache.render(font_med, f"{lap_num}/{len(laps)}", COLORS['text_white'])
+        canvas.blit(lap_value, LAP_VALUE_POS)
+        
+        # Lap time
+        time_value = text_cache.render(font_small, lap_time, COLORS['text_white'])
+        canvas.blit(time_value, TIME_VALUE_POS)
+        
+        # Speed
+        text_cache.blit_number(canvas, font_large, f"{int(current_speed)}", car_color, SPEED_VALUE_POS)
+        
+        # Progress bar
+        fill_w = int(BAR_W * progress_pct / 100)
+        pygame.draw.rect(canvas, COLORS['text_cyan'], (BAR_X, BAR_Y, fill_w, BAR_H))
+        
+        text_cache.blit_number(canvas, font_small, f"{progress_pct}%", COLORS['text_white'], PROGRESS_VALUE_POS)
+        
+        # Animation speed
+        multi_value = text_cache.render(font_med, f"x{speed_multiplier:.1f}", COLORS['text_magenta'])
+        canvas.blit(multi_value, ANIM_VALUE_POS)
+        
+        # Delta to the reference lap at the distance the current lap has covered
+        if ghost_mode:
+            reference = lap_cache.get(reference_lap_idx)
+            distance = np.interp(min(lap_clock, lap['lap_seconds']), lap['grid_time'], DISTANCE_GRID)
+            delta = min(lap_clock, lap['lap_seconds']) - np.interp(distance, DISTANCE_GRID, reference['grid_time'])
+            delta_label = text_cache.render(font_small, f"DELTA L{reference['lap_number']}", COLORS['text_dim'])
+            canvas.blit(delta_label, DELTA_LABEL_POS)
+            delta_color = COLORS['delta_ahead'] if delta <= 0 else COLORS['delta_behind']
+            text_cache.blit_number(canvas, font_med, f"{delta:+.3f}", delta_color, DELTA_VALUE_POS)
+        
+        # === CONTROLS BOX (Bottom Left) ===
+        canvas.blits(controls_box, doreturn=False)
+        
+        # Pause indicator
+        if show_pause:
+            canvas.blit(pause_badge, PAUSE_RECT)
+        profiler.mark('panel')
+        
+    except Exception as e:
+        error_text = font_small.render("LOADING", True, COLORS['text_magenta'])
+        canvas.blit(error_text, (20, NATIVE_HEIGHT // 2))
+        print(f"Error: {e}")
+    
+    # Apply CRT effect
+    canvas.blit(scanlines, (0, 0))
+    profiler.mark('crt')
 
-track_x, track_y = normalize_coords(np.array(all_x), np.array(all_y))
 
 # Animation state
 current_lap_idx = 0
 animation_running = True
-paused = False
-speed_multiplier = 2.0
+paused = args.paused
+speed_multiplier = args.speed
 elapsed_time = 0
 last_time = pygame.time.get_ticks()
 
+if headless_export:
+    # Each lap loops every 10 s of animation time at x1.0
+    frames_per_lap = max(int(10 * export_fps / export_speed), 1)
+    speed_multiplier = export_speed
+    export_surface = pygame.Surface((WIDTH, HEIGHT))
+    
+    def render_export_frame(frame):
+        """Frame i of the export: every lap in turn, drawn exactly as the window would"""
+        lap_idx, lap_frame = divmod(frame, frames_per_lap)
+        draw_frame(lap_idx, lap_frame * 1000.0 * export_speed / export_fps)
+        present(canvas, export_surface)
+        return export_surface
+    
+    print(f">>> EXPORTING {len(laps)} LAPS ({len(laps) * frames_per_lap} FRAMES)")
+    export_frames(render_export_frame, len(laps) * frames_per_lap, (WIDTH, HEIGHT),
+                  out_dir=export_dir, video=export_video, fps=export_fps, workers=export_workers)
+    print(f">>> EXPORT COMPLETE: {export_video or export_dir}")
+    pygame.quit()
+    sys.exit()
+
 print(">>> TRACKSHIFT READY")
 
 # Main loop
 while animation_running:
+    profiler.begin_frame()
     current_time = pygame.time.get_ticks()
     dt = current_time - last_time
     last_time = current_time
@@ -171,186 +542,73 @@ while animation_running:
                 speed_multiplier = max(speed_multiplier - 0.5, 0.5)
             elif event.key == pygame.K_r:
                 elapsed_time = 0
+            elif event.key == pygame.K_g:
+                ghost_mode = not ghost_mode
+                elapsed_time = 0
+            elif event.key == pygame.K_f:
+                reference_lap_idx = current_lap_idx
+            elif event.key == pygame.K_F3:
+                show_profiler = not show_profiler
+                profile_overlay = None
+        elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+            scheduler.invalidate()
     
     if not paused:
         elapsed_time += dt * speed_multiplier
+    profiler.mark('events')
     
-    canvas.fill(COLORS['bg_dark'])
-    
-    # Draw track outline
-    if len(track_x) > 1:
-        track_points = list(zip(track_x[::3], track_y[::3]))
-        pygame.draw.lines(canvas, COLORS['track'], False, track_points, 4)
+    # What the frame shows; an unchanged description means the last frame is still up
+    show_pause = bool(paused and blink_on(pygame.time.get_ticks()))
+    scheduler.track('frame', (current_lap_idx, elapsed_time, speed_multiplier, ghost_mode, reference_lap_idx))
+    scheduler.track('pause', show_pause, PAUSE_RECT)
+    scheduler.track('profiler', (show_profiler, profiler.frames // 15 if show_profiler else 0))
+    dirty = scheduler.take_dirty()
+    if not dirty:
+        if paused:
+            # Sleep until input or the next blink toggle
+            scheduler.idle(until_blink(pygame.time.get_ticks()))
+        else:
+            # Playing, but under a millisecond passed (uncapped FPS); pace instead of sleeping a poll
+            scheduler.tick(clock)
+        continue
     
-    lap = laps.iloc[current_lap_idx]
+    draw_frame(current_lap_idx, elapsed_time, show_pause)
     
-    try:
-        tel = lap.get_car_data().add_distance()
-        pos = lap.get_pos_data()
-        
-        x = pos['X'].values
-        y = pos['Y'].values
-        speed = tel['Speed'].values
-        
-        min_len = min(len(x), len(y), len(speed))
-        x = x[:min_len]
-        y = y[:min_len]
-        speed = speed[:min_len]
-        
-        x_scaled, y_scaled = normalize_coords(x, y)
-        
-        points_per_second = len(x) / 10
-        frame_index = int((elapsed_time / 1000.0) * points_per_second) % len(x)
-        
-        # Draw trail
-        trail_length = min(60, frame_index)
-        for i in range(max(0, frame_index - trail_length), frame_index):
-            if i > 0 and i < len(speed):
-                color = speed_to_color(speed[i], speed.min(), speed.max())
-                pygame.draw.line(canvas, color,
-                               (x_scaled[i-1], y_scaled[i-1]),
-                               (x_scaled[i], y_scaled[i]), 4)
-        
-        # Draw car
-        car_color = speed_to_color(speed[frame_index], speed.min(), speed.max())
-        pygame.draw.circle(canvas, car_color, (x_scaled[frame_index], y_scaled[frame_index]), 6)
-        pygame.draw.circle(canvas, COLORS['text_yellow'], (x_scaled[frame_index], y_scaled[frame_index]), 6, 2)
-        
-        # === RIGHT PANEL ===
-        pygame.draw.rect(canvas, COLORS['panel_bg'], (PANEL_X, 0, PANEL_WIDTH, NATIVE_HEIGHT))
-        pygame.draw.line(canvas, COLORS['panel_border'], (PANEL_X, 0), (PANEL_X, NATIVE_HEIGHT), 3)
-        
-        lap_num = lap['LapNumber']
-        lap_time_obj = lap['LapTime']
-        if lap_time_obj is not None and not pd.isna(lap_time_obj):
-            lap_time = str(lap_time_obj).split('.')[0][-8:]
-        else:
-            lap_time = "N/A"
-        
-        current_speed = speed[frame_index]
-        progress_pct = int(frame_index * 100 / len(x))
-        
-        y_pos = 16
-        
-        # Driver name
-        title = font_large.render(driver, True, COLORS['text_yellow'])
-        canvas.blit(title, (PANEL_X + 10, y_pos))
-        y_pos += 28
-        
-        # Event name
-        event_display = event_name.split(' ')[0][:8] if ' ' in event_name else event_name[:8]
-        event_text = font_small.render(event_display.upper(), True, COLORS['text_cyan'])
-        canvas.blit(event_text, (PANEL_X + 10, y_pos))
-        y_pos += 24
-        
-        # Divider
-        pygame.draw.line(canvas, COLORS['panel_border'], 
-                        (PANEL_X + 6, y_pos), (PANEL_X + PANEL_WIDTH - 6, y_pos), 2)
-        y_pos += 12
-        
-        # Lap number
-        lap_label = font_small.render("LAP", True, COLORS['text_dim'])
-        canvas.blit(lap_label, (PANEL_X + 10, y_pos))
-        y_pos += 18
-        lap_value = font_med.render(f"{lap_num}/{len(laps)}", True, COLORS['text_white'])
-        canvas.blit(lap_value, (PANEL_X + 10, y_pos))
-        y_pos += 28
-        
-        # Lap time
-        time_label = font_small.render("TIME", True, COLORS['text_dim'])
-        canvas.blit(time_label, (PANEL_X + 10, y_pos))
-        y_pos += 18
-        time_value = font_small.render(lap_time, True, COLORS['text_white'])
-        canvas.blit(time_value, (PANEL_X + 10, y_pos))
-        y_pos += 24
-        
-        # Speed
-        speed_label = font_small.render("SPEED", True, COLORS['text_dim'])
-        canvas.blit(speed_label, (PANEL_X + 10, y_pos))
-        y_pos += 18
-        speed_value = font_large.render(f"{int(current_speed)}", True, car_color)
-        canvas.blit(speed_value, (PANEL_X + 10, y_pos))
-        speed_unit = font_small.render("KM/H", True, COLORS['text_dim'])
-        canvas.blit(speed_unit, (PANEL_X + 10, y_pos + 24))
-        y_pos += 52
-        
-        # Progress bar
-        bar_w = PANEL_WIDTH - 24
-        bar_h = 10
-        bar_x = PANEL_X + 10
-        pygame.draw.rect(canvas, COLORS['track'], (bar_x, y_pos, bar_w, bar_h))
-        fill_w = int(bar_w * progress_pct / 100)
-        pygame.draw.rect(canvas, COLORS['text_cyan'], (bar_x, y_pos, fill_w, bar_h))
-        y_pos += 16
-        
-        prog_text = font_small.render(f"{progress_pct}%", True, COLORS['text_white'])
-        canvas.blit(prog_text, (PANEL_X + 10, y_pos))
-        y_pos += 24
-        
-        # Animation speed
-        multi_label = font_small.render("ANIM", True, COLORS['text_dim'])
-        canvas.blit(multi_label, (PANEL_X + 10, y_pos))
-        y_pos += 18
-        multi_value = font_med.render(f"x{speed_multiplier:.1f}", True, COLORS['text_magenta'])
-        canvas.blit(multi_value, (PANEL_X + 10, y_pos))
-        
-        # === CONTROLS BOX (Bottom Left) ===
-        control_box_width = 130
-        control_box_height = 80
-        control_box_x = 10
-        control_box_y = NATIVE_HEIGHT - control_box_height - 10
-        
-        # Draw semi-transparent background
-        control_bg = pygame.Surface((control_box_width, control_box_height), pygame.SRCALPHA)
-        control_bg.fill((*COLORS['control_box_bg'], 200))
-        canvas.blit(control_bg, (control_box_x, control_box_y))
-        
-        # Draw border
-        pygame.draw.rect(canvas, COLORS['control_box_border'], 
-                        (control_box_x, control_box_y, control_box_width, control_box_height), 2)
-        
-        # Controls text
-        ctrl_y = control_box_y + 8
-        ctrl_x = control_box_x + 6
-        
-        ctrl_title = font_tiny.render("CONTROLS", True, COLORS['text_cyan'])
-        canvas.blit(ctrl_title, (ctrl_x, ctrl_y))
-        ctrl_y += 14
-        
-        controls = [
-            "PAUSE - Space",
-            "LAP - Right/Left",
-            "SPEED - Up/Down",
-            "RESET - R"
-        ]
-        for ctrl in controls:
-            ctrl_text = font_tiny.render(ctrl, True, COLORS['text_white'])
-            canvas.blit(ctrl_text, (ctrl_x, ctrl_y))
-            ctrl_y += 13
-        
-        # Pause indicator
-        if paused:
-            if (pygame.time.get_ticks() // 400) % 2:
-                pause_bg = pygame.Surface((100, 24))
-                pause_bg.fill(COLORS['panel_border'])
-                canvas.blit(pause_bg, (MAP_WIDTH // 2 - 50, 20))
-                pause_text = font_large.render("PAUSE", True, COLORS['text_yellow'])
-                canvas.blit(pause_text, (MAP_WIDTH // 2 - 44, 22))
-        
-    except Exception as e:
-        error_text = font_small.render("LOADING", True, COLORS['text_magenta'])
-        canvas.blit(error_text, (20, NATIVE_HEIGHT // 2))
-        print(f"Error: {e}")
+    # Profiler HUD (top right of the map)
+    if show_profiler:
+        if profile_overlay is None or profiler.frames % 15 == 0:
+            profile_overlay = build_profile_overlay(font_tiny, COLORS, profiler.summary())
+        canvas.blit(profile_overlay, (MAP_WIDTH - profile_overlay.get_width() - 8, 8))
+    profiler.mark('overlay')
     
-    # Apply CRT effect
-    apply_crt_effect(canvas)
+    # Scale up straight into the display surface, only where the frame changed
+    if dirty == [scheduler.full]:
+        present(canvas, screen)
+        profiler.mark('scale')
+        pygame.display.flip()
+    else:
+        updated = present_rects(canvas, screen, dirty)
+        profiler.mark('scale')
+        pygame.display.update(updated)
+    profiler.mark('flip')
     
-    # Scale up
-    scaled_canvas = pygame.transform.scale(canvas, (WIDTH, HEIGHT))
-    screen.blit(scaled_canvas, (0, 0))
+    # Warm the neighbouring laps after the frame is out, at most one per frame
+    if prefetch_laps and len(laps) > 1:
+        for neighbour in ((current_lap_idx + 1) % len(laps), (current_lap_idx - 1) % len(laps)):
+            if neighbour not in lap_cache:
+                lap_cache.prefetch(neighbour, current_lap_idx)
+                break
+    profiler.mark('prefetch')
     
-    pygame.display.flip()
-    clock.tick(60)
+    scheduler.tick(clock)
+    profiler.mark('wait')
+    profiler.end_frame()
 
+print(f">>> Text cache: {text_cache.stats()}")
+print(f">>> Lap cache: {lap_cache.stats()}")
+print(f">>> Frames: {scheduler.stats()}")
+print(f">>> Frame timings over the last {len(profiler.samples['frame'])} frames:")
+print(profiler.report())
+profiler.close()
 pygame.quit()
 sys.exit()
@@ -0,0 +1,179 @@
+"""Synthetic FastF1-shaped race session for offline benchmarking
+
+SyntheticSession mimics the part of the FastF1 API that race_data uses:
+session.load(), session.event, session.laps.pick_drivers(), laps.iterlaps(),
+lap.get_car_data().add_distance() and lap.get_pos_data(). Cars lap a
+parametric circuit with a curvature-dependent speed profile. Everything is
+seeded, so the same arguments always build the same session.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Roughly the rate of FastF1 car and position data
+SAMPLE_HZ = 4.0
+
+# Real three-letter codes first, then D21, D22, ... for larger grids
+DRIVER_CODES = [
+    'VER', 'HAM', 'LEC', 'NOR', 'SAI', 'PER', 'RUS', 'ALO', 'PIA', 'GAS',
+    'OCO', 'STR', 'TSU', 'ALB', 'HUL', 'MAG', 'BOT', 'ZHO', 'SAR', 'RIC',
+]
+
+
+def driver_codes(num_drivers):
+    """Driver abbreviations for a grid of num_drivers cars"""
+    return [DRIVER_CODES[i] if i < len(DRIVER_CODES) else f"D{i + 1:02d}" for i in range(num_drivers)]
+
+
+class Circuit:
+    """Closed parametric track sampled by arc length, with a reference speed trace"""
+
+    def __init__(self, length=5000.0, seed=0, points=2000, min_speed=90.0, max_speed=320.0):
+        rng = np.random.default_rng(seed)
+        theta = np.linspace(0, 2 * np.pi, points + 1)
+
+        # Ellipse with a few random harmonics for corners and straights
+        radius = np.ones_like(theta)
+        for k in range(2, 6):
+            radius += rng.uniform(0.03, 0.12) * np.cos(k * theta + rng.uniform(0, 2 * np.pi))
+        x = radius * np.cos(theta)
+        y = 0.65 * radius * np.sin(theta)
+
+        segment = np.hypot(np.diff(x), np.diff(y))
+        scale = length / segment.sum()
+        self.x = x * scale
+        self.y = y * scale
+        self.distance = np.concatenate(([0.0], np.cumsum(segment * scale)))
+        self.length = float(self.distance[-1])
+
+        # Slow through tight sections: speed falls with smoothed heading change
+        heading = np.unwrap(np.arctan2(np.diff(self.y), np.diff(self.x)))
+        turning = np.abs(np.diff(heading, append=heading[0] + 2 * np.pi))
+        kernel = np.ones(25) / 25
+        turning = np.convolve(np.concatenate((turning[-12:], turning, turning[:12])), kernel, mode='valid')
+        turning = turning / turning.max()
+        segment_speed = max_speed - (max_speed - min_speed) * turning ** 0.5
+        self.speed = np.append(segment_speed, segment_speed[0])
+
+        # Time along the lap at the reference speed
+        self.time = np.concatenate(([0.0], np.cumsum(segment * scale / (segment_speed / 3.6))))
+        self.reference_lap_time = float(self.time[-1])
+
+    def sample(self, lap_time, hz=SAMPLE_HZ, lateral_offset=0.0):
+        """In-lap time, X, Y and speed at a fixed rate for one lap lasting lap_time seconds"""
+        pace = self.reference_lap_time / lap_time
+        t = np.arange(0.0, lap_time, 1.0 / hz)
+        s = np.interp(t * pace, self.time, self.distance)
+        x = np.interp(s, self.distance, self.x)
+        y = np.interp(s, self.distance, self.y) + lateral_offset
+        speed = np.interp(s, self.distance, self.speed) * pace
+        return t, x, y, speed
+
+
+@lru_cache(maxsize=8)
+def get_circuit(length, seed):
+    return Circuit(length, seed)
+
+
+class Telemetry(pd.DataFrame):
+    """Car or position data for one lap"""
+
+    @property
+    def _constructor(self):
+        return Telemetry
+
+    def add_distance(self):
+        """Copy with a Distance column integrated from Speed, as FastF1 does"""
+        telemetry = self.copy()
+        dt = np.diff(telemetry['Time'].dt.total_seconds().to_numpy(), prepend=0.0)
+        telemetry['Distance'] = np.cumsum(telemetry['Speed'].to_numpy() / 3.6 * dt)
+        return telemetry
+
+
+class SyntheticLap(pd.Series):
+    """One row of SyntheticLaps with FastF1's per-lap telemetry accessors"""
+
+    @property
+    def _constructor(self):
+        return SyntheticLap
+
+    def _sample(self):
+        circuit = get_circuit(self['TrackLength'], self['TrackSeed'])
+        return circuit.sample(self['LapTime'].total_seconds(), lateral_offset=self['LateralOffset'])
+
+    def get_car_data(self, **kwargs):
+        t, _, _, speed = self._sample()
+        time = pd.to_timedelta(t, unit='s')
+        return Telemetry({'Time': time, 'SessionTime': self['LapStartTime'] + time, 'Speed': speed})
+
+    def get_pos_data(self, **kwargs):
+        # Positions in decimeters, like the FastF1 live timing feed
+        t, x, y, _ = self._sample()
+        time = pd.to_timedelta(t, unit='s')
+        return Telemetry({'Time': time, 'SessionTime': self['LapStartTime'] + time,
+                          'X': x * 10, 'Y': y * 10, 'Z': np.zeros(len(t))})
+
+
+class SyntheticLaps(pd.DataFrame):
+    """Lap table with the FastF1 Laps selection and iteration helpers"""
+
+    @property
+    def _constructor(self):
+        return SyntheticLaps
+
+    @property
+    def _constructor_sliced(self):
+        return SyntheticLap
+
+    def pick_drivers(self, identifiers):
+        if isinstance(identifiers, str):
+            identifiers = [identifiers]
+        return self[self['Driver'].isin(identifiers)]
+
+    def iterlaps(self, require=None):
+        for index, row in self.iterrows():
+            yield index, SyntheticLap(row)
+
+
+class SyntheticEvent:
+    def __init__(self, name):
+        self.EventName = name
+        self.Location = "Synthetic"
+
+
+class SyntheticSession:
+    """FastF1-like session: num_drivers cars over num_laps laps of a generated circuit"""
+
+    def __init__(self, num_drivers=20, num_laps=50, track_length=5000.0, seed=0):
+        self.num_drivers = num_drivers
+        self.num_laps = num_laps
+        self.track_length = float(track_length)
+        self.seed = seed
+        self.name = "Race"
+        self.event = SyntheticEvent(f"Synthetic Grand Prix ({num_drivers} drivers)")
+        self.drivers = driver_codes(num_drivers)
+        self.laps = None
+
+    def load(self, **kwargs):
+        rng = np.random.default_rng(self.seed)
+        base_lap_time = get_circuit(self.track_length, self.seed).reference_lap_time
+
+        rows = []
+        for position, driver in enumerate(self.drivers):
+            pace = 1.0 + 0.002 * position + rng.uniform(0.0, 0.002)
+            lap_times = base_lap_time * pace + rng.normal(0.0, 0.3, self.num_laps)
+            lap_times[0] += 4.0 + 0.4 * position  # Standing start, gridded by position
+            start = 0.0
+            for lap_number, lap_time in enumerate(lap_times, start=1):
+                rows.append({
+                    'Driver': driver,
+                    'LapNumber': float(lap_number),
+                    'LapTime': pd.Timedelta(seconds=float(lap_time)),
+                    'LapStartTime': pd.Timedelta(seconds=start),
+                    'TrackLength': self.track_length,
+                    'TrackSeed': self.seed,
+                    'LateralOffset': (position % 3 - 1) * 1.5,
+                })
+                start += lap_time
+        self.laps = SyntheticLaps(rows)